@@ -8,7 +8,7 @@ from typing import Dict, Any
 from loguru import logger
 
 from app.services.pdpj_client import pdpj_client
-from app.utils.monitoring_integration import get_health_status, get_prometheus_metrics
+from app.utils.monitoring_integration import get_health_status, get_prometheus_metrics_bytes
 
 router = APIRouter(prefix="/monitoring", tags=["monitoring"])
 
@@ -41,8 +41,8 @@ async def health_check() -> Dict[str, Any]:
 async def prometheus_metrics() -> PlainTextResponse:
     """Endpoint de métricas Prometheus."""
     try:
-        metrics_text = get_prometheus_metrics()
-        return PlainTextResponse(content=metrics_text, media_type="text/plain")
+        # Bytes prontos do registry (cacheados brevemente), sem decodificar/reencodar
+        return PlainTextResponse(content=get_prometheus_metrics_bytes(), media_type="text/plain")
     except Exception as e:
         logger.error(f"Erro ao obter métricas Prometheus: {e}")
         raise HTTPException(status_code=500, detail=f"Erro ao obter métricas: {e}")
@@ -6,7 +6,6 @@ from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update, func
-from sqlalchemy.orm import selectinload
 from loguru import logger
 
 from app.core.database import get_db
@@ -39,6 +38,7 @@ from app.utils.pagination_utils import (
     apply_process_filters,
     apply_document_filters,
     paginate_results,
+    split_rows_with_total,
     ProcessPaginationParams,
     DocumentPaginationParams
 )
@@ -106,22 +106,23 @@ async def list_processes(
         # Construir query base
         query = select(Process)
         
-        # Aplicar filtros e paginação
-        query = apply_process_filters(query, pagination)
+        # Aplicar filtros e paginação (total via COUNT(*) OVER () na mesma query)
+        query = apply_process_filters(query, pagination, with_total=True)
         
         # Executar query
         result = await db.execute(query)
-        processes = result.scalars().all()
-        
-        # Contar total para paginação
-        count_query = select(Process)
-        if pagination.filter_court:
-            count_query = count_query.filter(Process.court == pagination.filter_court)
-        if pagination.filter_has_documents is not None:
-            count_query = count_query.filter(Process.has_documents == pagination.filter_has_documents)
-        
-        total_result = await db.execute(select(func.count()).select_from(count_query.subquery()))
-        total = total_result.scalar()
+        processes, total = split_rows_with_total(result.all())
+        
+        # Página vazia: contar à parte para paginação
+        if total is None:
+            count_query = select(Process)
+            if pagination.filter_court:
+                count_query = count_query.filter(Process.court == pagination.filter_court)
+            if pagination.filter_has_documents is not None:
+                count_query = count_query.filter(Process.has_documents == pagination.filter_has_documents)
+            
+            total_result = await db.execute(select(func.count()).select_from(count_query.subquery()))
+            total = total_result.scalar()
         
         logger.info(f"✅ Encontrados {len(processes)} processos de {total} total")
         
@@ -146,23 +147,9 @@ async def get_process(
 ):
     """Obter dados de um processo específico."""
     try:
-        # Verificar cache primeiro (se não for refresh forçado)
-        if not force_refresh:
-            cache_key = get_process_cache_key(process_number, "full")
-            cached_data = await cache_service.get(cache_key)
-            
-            if cached_data:
-                # Buscar processo no banco para dados estruturados (usando número normalizado)
-                normalized_number = normalize_process_number(process_number)
-                result = await db.execute(
-                    select(Process).where(Process.process_number == normalized_number)
-                )
-                process = result.scalar_one_or_none()
-                
-                if process:
-                    return ProcessResponse.model_validate(process)
-        
-        # Buscar processo no banco (usando número normalizado)
+        # Buscar processo no banco (usando número normalizado). A resposta vem sempre
+        # do registro estruturado; um cache hit levaria à mesma consulta, então ela
+        # é feita uma única vez em vez de repetida após a verificação do cache.
         normalized_number = normalize_process_number(process_number)
         result = await db.execute(
             select(Process).where(Process.process_number == normalized_number)
@@ -185,9 +172,10 @@ async def get_process(
                     has_documents=bool(pdpj_data.get("documentos"))
                 )
                 
+                # Sem refresh: id vem do INSERT ... RETURNING, os defaults são do lado Python
+                # e a sessão não expira atributos no commit (expire_on_commit=False)
                 db.add(process)
                 await db.commit()
-                await db.refresh(process)
                 
                 # Armazenar no cache
                 cache_key = get_process_cache_key(process_number, "full")
@@ -335,53 +323,43 @@ async def get_process_files(
     logger.info(f"📁 Iniciando busca de documentos para processo: {process_number}")
     
     try:
-        # Buscar processo no banco (usando número normalizado)
         normalized_number = normalize_process_number(process_number)
         logger.info(f"🔍 Número normalizado: {normalized_number}")
         
-        result = await db.execute(
-            select(Process)
-            .where(Process.process_number == normalized_number)
-            .options(selectinload(Process.documents))
-        )
-        process = result.scalar_one_or_none()
-        
-        if process:
-            logger.info(f"✅ Processo encontrado com {len(process.documents)} documentos")
-        else:
-            logger.warning(f"❌ Processo não encontrado: {process_number}")
-        
-        if not process:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Processo {process_number} não encontrado"
-            )
-        
         # Verificar rate limit
         await get_files_rate_limit(None, current_user)
         
-        # Buscar documentos no banco com paginação e filtros
-        logger.info(f"🔍 Buscando documentos no banco para processo ID: {process.id}")
-        
-        # Construir query base
-        query = select(Document).where(Document.process_id == process.id)
+        # Buscar documentos com JOIN no processo (número normalizado): uma única ida ao
+        # banco em vez de SELECT do processo seguido do SELECT dos documentos
+        process_filter = Process.process_number == normalized_number
+        query = select(Document).join(Process, Document.process_id == Process.id).where(process_filter)
         
-        # Aplicar filtros e paginação
-        query = apply_document_filters(query, pagination)
+        # Aplicar filtros e paginação (total via COUNT(*) OVER () na mesma query)
+        query = apply_document_filters(query, pagination, with_total=True)
         
         # Executar query
         result = await db.execute(query)
-        documents = result.scalars().all()
+        documents, total = split_rows_with_total(result.all())
         
-        # Contar total para paginação
-        count_query = select(Document).where(Document.process_id == process.id)
-        if pagination.filter_type:
-            count_query = count_query.filter(Document.type == pagination.filter_type)
-        if pagination.filter_downloaded is not None:
-            count_query = count_query.filter(Document.downloaded == pagination.filter_downloaded)
+        if not documents:
+            # Página vazia: só aqui é preciso distinguir processo inexistente de processo sem documentos
+            process_result = await db.execute(select(Process.id).where(process_filter))
+            if process_result.scalar_one_or_none() is None:
+                logger.warning(f"❌ Processo não encontrado: {process_number}")
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Processo {process_number} não encontrado"
+                )
         
-        total_result = await db.execute(select(func.count()).select_from(count_query.subquery()))
-        total = total_result.scalar()
+            # Contar total para paginação (não veio nas linhas da página)
+            count_query = select(Document).join(Process, Document.process_id == Process.id).where(process_filter)
+            if pagination.filter_type:
+                count_query = count_query.filter(Document.type == pagination.filter_type)
+            if pagination.filter_downloaded is not None:
+                count_query = count_query.filter(Document.downloaded == pagination.filter_downloaded)
+            
+            total_result = await db.execute(select(func.count()).select_from(count_query.subquery()))
+            total = total_result.scalar()
         
         logger.info(f"📄 Encontrados {len(documents)} documentos de {total} total")
         
@@ -468,28 +446,24 @@ async def refresh_process(
                 detail=f"Processo {process_number} não encontrado: {str(e)}"
             )
         
-        # Buscar processo no banco (usando número normalizado)
+        # Atualizar processo existente (usando número normalizado); o RETURNING indica
+        # na mesma ida ao banco se a linha existia, sem um SELECT prévio
         normalized_number = normalize_process_number(process_number)
         result = await db.execute(
-            select(Process).where(Process.process_number == normalized_number)
+            update(Process)
+            .where(Process.process_number == normalized_number)
+            .values(
+                full_data=pdpj_data,
+                court=pdpj_data.get("siglaTribunal"),
+                subject=pdpj_data.get("tramitacoes", [{}])[0].get("assunto", [{}])[0].get("descricao") if pdpj_data.get("tramitacoes") else None,
+                status=pdpj_data.get("tramitacaoAtual", {}).get("descricao"),
+                has_documents=bool(pdpj_data.get("documentos")),
+                last_consultation=datetime.utcnow()
+            )
+            .returning(Process.id)
         )
-        process = result.scalar_one_or_none()
         
-        if process:
-            # Atualizar processo existente
-            await db.execute(
-                update(Process)
-                .where(Process.id == process.id)
-                .values(
-                    full_data=pdpj_data,
-                    court=pdpj_data.get("siglaTribunal"),
-                    subject=pdpj_data.get("tramitacoes", [{}])[0].get("assunto", [{}])[0].get("descricao") if pdpj_data.get("tramitacoes") else None,
-                    status=pdpj_data.get("tramitacaoAtual", {}).get("descricao"),
-                    has_documents=bool(pdpj_data.get("documentos")),
-                    last_consultation=datetime.utcnow()
-                )
-            )
-        else:
+        if result.scalar_one_or_none() is None:
             # Criar novo processo (usando número normalizado)
             process = Process(
                 process_number=normalized_number,
@@ -718,26 +692,34 @@ async def download_document_physical(
                 detail=f"hrefBinario não encontrado para o documento {document_id}"
             )
         
-        # Baixar documento da API PDPJ usando hrefBinario
+        # Transmitir o documento da API PDPJ direto para o S3 (multipart), sem
+        # manter o arquivo inteiro em memória
         try:
-            document_content = await pdpj_client.download_document(href_binario)
+            s3_result = await s3_service.upload_stream(
+                pdpj_client.stream_document(
+                    href_binario,
+                    process_number=normalized_number,
+                    expected_content_type=document.mime_type
+                ),
+                process_number=normalized_number,
+                document_id=document_id,
+                filename=document.name,
+                content_type=document.mime_type or "application/pdf"
+            )
         except PDPJClientError as e:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Erro ao baixar documento: {str(e)}"
             )
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Erro ao fazer upload para S3: {str(e)}"
+            )
         
-        # Gerar chave S3
-        s3_key = f"processos/{process_number}/documentos/{document_id}/{document.name}"
+        s3_key = s3_result["s3_key"]
         
-        # Upload para S3
         try:
-            await s3_service.upload_file(
-                file_content=document_content,
-                s3_key=s3_key,
-                content_type=document.mime_type or "application/pdf"
-            )
-            
             # Gerar URL presignada
             download_url = await s3_service.generate_presigned_url(s3_key, expiration=3600)
             
@@ -747,9 +729,9 @@ async def download_document_physical(
                 .where(Document.id == document.id)
                 .values(
                     s3_key=s3_key,
-                    s3_bucket=s3_service.bucket_name,
+                    s3_bucket=s3_result["bucket"],
                     download_url=download_url,
-                    size=len(document_content),
+                    size=s3_result["file_size"],
                     downloaded=True,
                     updated_at=datetime.utcnow()
                 )
@@ -761,7 +743,7 @@ async def download_document_physical(
                 "message": f"Documento {document_id} baixado e armazenado com sucesso",
                 "document_id": document_id,
                 "name": document.name,
-                "size": len(document_content),
+                "size": s3_result["file_size"],
                 "s3_key": s3_key,
                 "download_url": download_url,
                 "expires_in": 3600
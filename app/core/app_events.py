@@ -2,7 +2,6 @@
 
 import sys
 import time
-import asyncio
 from datetime import datetime
 from fastapi import FastAPI
 from loguru import logger
@@ -100,12 +99,10 @@ def register_shutdown_events(app: FastAPI):
                     logger.info(f"Workers ativos encontrados: {list(active_workers.keys())}")
                     
                     # Enviar shutdown para workers ativos
+                    # reply=True já aguarda as confirmações dos workers (até o timeout)
                     shutdown_result = celery_app.control.broadcast('shutdown', reply=True, timeout=10)
                     logger.info(f"Shutdown enviado para workers: {shutdown_result}")
                     
-                    # Aguardar confirmação (com timeout)
-                    await asyncio.sleep(2)  # Aguardar workers processarem shutdown
-                    
                 else:
                     logger.info("Nenhum worker ativo encontrado")
                     
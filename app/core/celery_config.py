@@ -0,0 +1,29 @@
+"""Configuração Celery das tarefas otimizadas (``app.tasks.optimized_celery_tasks``).
+
+Carregada via ``celery_app.config_from_object('app.core.celery_config')``.
+
+Tarefas curtas (buscas com cache) e longas (lotes grandes) ficam em filas
+separadas, cada uma com seu próprio worker e prefetch:
+
+    celery -A app.tasks.optimized_celery_tasks worker -Q batch_search,downloads --prefetch-multiplier=2 -c 8
+    celery -A app.tasks.optimized_celery_tasks worker -Q large_batch --prefetch-multiplier=1 -c 2
+"""
+
+from app.core.config import settings
+
+broker_url = settings.celery_broker_url
+result_backend = settings.celery_result_backend
+
+# Roteamento pelo nome registrado de cada task (``name=...`` no decorator)
+task_routes = {
+    # Curtas, I/O-bound
+    'process_batch_search_optimized': {'queue': 'batch_search', 'priority': 5},
+    'download_documents_batch': {'queue': 'downloads', 'priority': 3},
+    # Longas: fila própria para não reservar buscas curtas atrás delas
+    'process_large_batch': {'queue': 'large_batch', 'priority': 1},
+    'consolidate_results': {'queue': 'large_batch', 'priority': 1},
+    # Manutenção e monitoramento: curtas, vão para a fila consumida pelo worker de buscas
+    # (filas próprias ficariam sem consumidor nos comandos acima)
+    'cleanup_old_tasks': {'queue': 'batch_search', 'priority': 9},
+    'health_check': {'queue': 'batch_search', 'priority': 10},
+}
@@ -11,12 +11,16 @@ class Base(DeclarativeBase):
 
 
 # Engine assíncrono para PostgreSQL
+# Pool dimensionado para downloads/buscas concorrentes; sem pre-ping por checkout
+# (conexões quebradas são descartadas pelo asyncpg e recicladas por pool_recycle)
 engine = create_async_engine(
     settings.database_url,
     echo=settings.debug,
     future=True,
-    pool_pre_ping=True,
-    pool_recycle=300,
+    pool_size=settings.database_pool_size,
+    max_overflow=settings.database_max_overflow,
+    pool_pre_ping=settings.database_pool_pre_ping,
+    pool_recycle=settings.database_pool_recycle,
 )
 
 # Factory para criar sessões assíncronas
@@ -28,12 +32,15 @@ AsyncSessionLocal = async_sessionmaker(
 
 
 async def get_db() -> AsyncSession:
-    """Dependency para obter sessão do banco de dados."""
+    """Dependency para obter sessão do banco de dados.
+    
+    O ``async with`` já garante o ``close()`` da sessão em qualquer caminho;
+    aqui só é necessário o rollback explícito em caso de erro. Fora de requests
+    (tasks, scripts), use ``async with AsyncSessionLocal() as db`` diretamente.
+    """
     async with AsyncSessionLocal() as session:
         try:
             yield session
         except Exception:
             await session.rollback()
             raise
-        finally:
-            await session.close()
@@ -1,8 +1,9 @@
 """Cliente otimizado para integração com a API PDPJ com funcionalidades ultra-fast."""
 
 import asyncio
+import re
 import time
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
 from datetime import datetime
 import httpx
 import aiohttp
@@ -18,7 +19,7 @@ from app.core.config import settings
 from app.services.session_manager import get_active_session_cookie
 from app.utils.file_utils import process_document_download
 from app.utils.token_validator import PDPJTokenValidator
-from app.utils.http_headers import get_api_headers, get_download_headers
+from app.utils.http_headers import get_api_headers, get_api_headers_bytes, get_download_headers
 from app.utils.monitoring_integration import (
     record_request_metrics, 
     record_download_metrics, 
@@ -27,8 +28,46 @@ from app.utils.monitoring_integration import (
 )
 
 
+# Campos alternativos em que a API informa o número do processo (usados na validação de schema)
+_PROCESS_NUMBER_FIELDS = ("numeroProcesso", "numero", "processo", "numero_processo")
+# Segmentos de path com número de processo/identificador (dígitos, pontos e hífens)
+_ID_SEGMENT_RE = re.compile(r'(?:^|(?<=/))[\d.\-]{5,}(?=/|$)')
+
+
+def _metric_endpoint(endpoint: str) -> str:
+    """Endpoint como template de rota para labels de métricas.
+    
+    Números de processo no path viram ``{numero}`` e a query string mantém só os nomes
+    dos parâmetros (ex.: ``processos/{numero}``, ``processos?numeroProcesso``), para que
+    cada processo não crie uma nova série no Prometheus.
+    """
+    path, sep, query = endpoint.partition('?')
+    path = _ID_SEGMENT_RE.sub('{numero}', path)
+    if sep:
+        path += '?' + '&'.join(param.partition('=')[0] for param in query.split('&'))
+    return path
+
+
 class PDPJClientError(Exception):
-    """Exceção customizada para erros da API PDPJ."""
+    """Exceção customizada para erros da API PDPJ.
+    
+    ``status_code`` e ``response`` (quando houver) permitem que o retry leia o status e
+    os headers da resposta (ex.: Retry-After em 429, ver ``AdvancedRetry.retry_after_hint``).
+    """
+    
+    def __init__(self, message: str = "", status_code: Optional[int] = None, response: Any = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = response
+
+
+class TransientPDPJError(PDPJClientError):
+    """Erro transitório da API PDPJ (5xx, 429, timeout, falha de conexão) que pode ser repetido."""
+    pass
+
+
+class PermanentPDPJError(PDPJClientError):
+    """Erro definitivo da API PDPJ (4xx) que não deve ser repetido."""
     pass
 
 
@@ -45,6 +84,7 @@ class PDPJClient:
         self.download_timeout = getattr(settings, 'pdpj_download_timeout', 60.0)
         self.max_retries = getattr(settings, 'pdpj_max_retries', 3)
         self.retry_delay = getattr(settings, 'pdpj_retry_delay', 1.0)
+        self.download_dir = getattr(settings, 'pdpj_download_dir', 'data/downloads')
         
         # Configurações de conexão HTTP
         self.max_connections = getattr(settings, 'pdpj_max_connections', 10)
@@ -128,9 +168,10 @@ class PDPJClient:
         """Executar requisição HTTP real."""
         
         url = f"{self.base_url.rstrip('/')}/{endpoint.lstrip('/')}"
+        metric_endpoint = _metric_endpoint(endpoint)
         
-        # Headers padrão usando configuração centralizada
-        default_headers = get_api_headers(self.token, headers)
+        # Headers padrão usando configuração centralizada (já em bytes quando não há customização)
+        default_headers = get_api_headers(self.token, headers) if headers else get_api_headers_bytes(self.token)
         
         # DEBUG: Log detalhado da requisição (apenas em modo debug)
         if getattr(settings, 'debug', False):
@@ -177,7 +218,7 @@ class PDPJClient:
                         
                         # Registrar métricas de sucesso
                         duration = time.time() - start_time
-                        record_request_metrics(method, endpoint, 200, duration)
+                        record_request_metrics(method, metric_endpoint, 200, duration)
                         
                         return result
                     except Exception as json_error:
@@ -185,16 +226,16 @@ class PDPJClient:
                         logger.error(f"❌ Conteúdo da resposta: {response.text[:500]}...")
                         self._metrics['http_errors']['other'] += 1
                         duration = time.time() - start_time
-                        record_error_metrics("json_decode_error", endpoint, str(json_error))
-                        record_request_metrics(method, endpoint, 200, duration)  # Status 200 mas erro JSON
+                        record_error_metrics("json_decode_error", metric_endpoint, str(json_error))
+                        record_request_metrics(method, metric_endpoint, 200, duration)  # Status 200 mas erro JSON
                         raise PDPJClientError(f"Resposta inválida da API: {json_error}")
                 elif response.status_code == 404:
                     logger.warning(f"Processo não encontrado: {url}")
                     self._metrics['http_errors']['404'] += 1
                     duration = time.time() - start_time
-                    record_error_metrics("not_found", endpoint, "Processo não encontrado")
-                    record_request_metrics(method, endpoint, 404, duration)
-                    raise PDPJClientError("Processo não encontrado")
+                    record_error_metrics("not_found", metric_endpoint, "Processo não encontrado")
+                    record_request_metrics(method, metric_endpoint, 404, duration)
+                    raise PermanentPDPJError("Processo não encontrado")
                 elif response.status_code == 401:
                     logger.error("Token PDPJ inválido ou expirado")
                     logger.error(f"🔍 DEBUG - Resposta de erro 401: {response.text}")
@@ -202,59 +243,63 @@ class PDPJClient:
                     logger.error(f"🔍 DEBUG - Headers enviados: {default_headers}")
                     self._metrics['http_errors']['401'] += 1
                     duration = time.time() - start_time
-                    record_error_metrics("unauthorized", endpoint, "Token inválido")
-                    record_request_metrics(method, endpoint, 401, duration)
-                    raise PDPJClientError("Token de autenticação inválido")
+                    record_error_metrics("unauthorized", metric_endpoint, "Token inválido")
+                    record_request_metrics(method, metric_endpoint, 401, duration)
+                    raise PermanentPDPJError("Token de autenticação inválido")
                 elif response.status_code == 429:
                     logger.warning("Rate limit atingido na API PDPJ")
                     self._metrics['http_errors']['429'] += 1
                     duration = time.time() - start_time
-                    record_error_metrics("rate_limit", endpoint, "Rate limit atingido")
-                    record_request_metrics(method, endpoint, 429, duration)
+                    record_error_metrics("rate_limit", metric_endpoint, "Rate limit atingido")
+                    record_request_metrics(method, metric_endpoint, 429, duration)
                     # Implementar backoff adaptativo
                     await self._handle_rate_limit(attempt)
                     if attempt < self.max_retries - 1:
                         continue
-                    raise PDPJClientError("Rate limit atingido")
+                    raise TransientPDPJError("Rate limit atingido", status_code=429, response=response)
                 elif response.status_code >= 500:
                     logger.error(f"Erro do servidor HTTP {response.status_code}: {response.text}")
                     self._metrics['http_errors']['500'] += 1
                     duration = time.time() - start_time
-                    record_error_metrics("server_error", endpoint, f"Erro {response.status_code}")
-                    record_request_metrics(method, endpoint, response.status_code, duration)
-                    response.raise_for_status()
+                    record_error_metrics("server_error", metric_endpoint, f"Erro {response.status_code}")
+                    record_request_metrics(method, metric_endpoint, response.status_code, duration)
+                    raise TransientPDPJError(
+                        f"Erro do servidor HTTP {response.status_code}",
+                        status_code=response.status_code,
+                        response=response
+                    )
                 else:
                     logger.error(f"Erro HTTP {response.status_code}: {response.text}")
                     logger.error(f"🔍 DEBUG - Resposta completa: {response.text}")
                     self._metrics['http_errors']['other'] += 1
                     duration = time.time() - start_time
-                    record_error_metrics("http_error", endpoint, f"Erro {response.status_code}")
-                    record_request_metrics(method, endpoint, response.status_code, duration)
+                    record_error_metrics("http_error", metric_endpoint, f"Erro {response.status_code}")
+                    record_request_metrics(method, metric_endpoint, response.status_code, duration)
                     response.raise_for_status()
                     
             except httpx.TimeoutException:
                 logger.warning(f"Timeout na requisição para {url} (tentativa {attempt + 1})")
                 self._metrics['http_errors']['timeout'] += 1
                 duration = time.time() - start_time
-                record_error_metrics("timeout", endpoint, "Timeout na requisição")
-                record_request_metrics(method, endpoint, 0, duration)  # Status 0 para timeout
+                record_error_metrics("timeout", metric_endpoint, "Timeout na requisição")
+                record_request_metrics(method, metric_endpoint, 0, duration)  # Status 0 para timeout
                 if attempt < self.max_retries - 1:
                     await asyncio.sleep(self.retry_delay * (2 ** attempt))
                     continue
-                raise PDPJClientError("Timeout na requisição")
+                raise TransientPDPJError("Timeout na requisição")
             
             except httpx.RequestError as e:
                 logger.error(f"Erro de requisição para {url}: {e}")
                 self._metrics['http_errors']['other'] += 1
                 duration = time.time() - start_time
-                record_error_metrics("request_error", endpoint, str(e))
-                record_request_metrics(method, endpoint, 0, duration)  # Status 0 para erro de requisição
+                record_error_metrics("request_error", metric_endpoint, str(e))
+                record_request_metrics(method, metric_endpoint, 0, duration)  # Status 0 para erro de requisição
                 if attempt < self.max_retries - 1:
                     await asyncio.sleep(self.retry_delay * (2 ** attempt))
                     continue
-                raise PDPJClientError(f"Erro de requisição: {e}")
+                raise TransientPDPJError(f"Erro de requisição: {e}")
             
-            raise PDPJClientError("Máximo de tentativas excedido")
+            raise TransientPDPJError("Máximo de tentativas excedido")
     
     async def _handle_rate_limit(self, attempt: int) -> None:
         """Implementar backoff adaptativo para rate limiting."""
@@ -293,13 +338,11 @@ class PDPJClient:
                             logger.debug(f"ℹ️ Item da lista não é dict: {type(item)}")
                             continue
                         # Verificar campos alternativos para número do processo
-                        process_fields = ["numeroProcesso", "numero", "processo", "numero_processo"]
-                        if not any(field in item for field in process_fields):
+                        if not any(field in item for field in _PROCESS_NUMBER_FIELDS):
                             logger.debug(f"ℹ️ Campos de processo não encontrados em item da lista (campos disponíveis: {list(item.keys())[:5]})")
                 elif isinstance(response_data, dict):
                     # Processo único
-                    process_fields = ["numeroProcesso", "numero", "processo", "numero_processo"]
-                    if not any(field in response_data for field in process_fields):
+                    if not any(field in response_data for field in _PROCESS_NUMBER_FIELDS):
                         logger.debug(f"ℹ️ Campos de processo não encontrados na resposta (campos disponíveis: {list(response_data.keys())[:5]})")
             
             elif "documentos" in endpoint:
@@ -410,6 +453,8 @@ class PDPJClient:
             logger.info(f"Dados completos do processo {process_number} obtidos com sucesso")
             return process_data
             
+        except TransientPDPJError:
+            raise
         except Exception as e:
             logger.error(f"Erro ao buscar dados completos do processo {process_number}: {e}")
             raise PDPJClientError(f"Erro ao buscar dados completos: {e}")
@@ -442,6 +487,8 @@ class PDPJClient:
             logger.info(f"✅ Total de {len(documents)} documentos encontrados")
             return documents
             
+        except TransientPDPJError:
+            raise
         except Exception as e:
             logger.error(f"Erro ao buscar documentos do processo {process_number}: {e}")
             raise PDPJClientError(f"Erro ao buscar documentos: {e}")
@@ -451,11 +498,12 @@ class PDPJClient:
         href_binario: str, 
         document_name: str = None, 
         session_cookie: str = None,
-        timeout: Optional[float] = None
+        timeout: Optional[float] = None,
+        process_number: Optional[str] = None
     ) -> Dict[str, Any]:
         """Baixar um documento específico via portal web PDPJ com headers do navegador e validação."""
         try:
-            logger.info(f"🌐 Baixando documento via portal web: {href_binario}")
+            logger.debug(f"🌐 Baixando documento via portal web: {href_binario}")
             
             # Usar timeout configurável
             download_timeout = timeout or self.download_timeout
@@ -473,45 +521,119 @@ class PDPJClient:
                 session_cookie = await get_active_session_cookie(self.base_url, self.token)
             
             # Headers do navegador usando configuração centralizada
-            process_number = self._extract_process_number_from_href(href_binario)
+            # (o número do processo só é extraído do href quando o chamador não o informa)
+            if not process_number:
+                process_number = self._extract_process_number_from_href(href_binario)
             headers = get_download_headers(self.token, session_cookie, process_number)
             
             if session_cookie:
                 logger.debug(f"🍪 Usando cookie de sessão: {session_cookie[:20]}...")
             
+            # Reutilizar o pool de conexões do cliente persistente (sem handshake TLS por documento)
+            client = await self._get_persistent_client()
+            
             # Usar timeout explícito (compatível com versões do Python)
             if asyncio_timeout:
                 async with asyncio_timeout(download_timeout):
-                    async with httpx.AsyncClient(timeout=download_timeout) as client:
-                        return await self._execute_download(client, document_url, headers, document_name)
+                    return await self._execute_download(client, document_url, headers, document_name, download_timeout)
             else:
                 # Fallback para versões sem asyncio.timeout
-                async with httpx.AsyncClient(timeout=download_timeout) as client:
-                    return await self._execute_download(client, document_url, headers, document_name)
+                return await self._execute_download(client, document_url, headers, document_name, download_timeout)
                     
         except Exception as e:
             logger.error(f"❌ Erro no download do documento: {e}")
             raise PDPJClientError(f"Erro no download: {e}")
     
-    async def _execute_download(self, client: httpx.AsyncClient, document_url: str, headers: Dict, document_name: str) -> Dict[str, Any]:
+    async def stream_document(
+        self,
+        href_binario: str,
+        session_cookie: str = None,
+        timeout: Optional[float] = None,
+        chunk_size: int = 64 * 1024,
+        process_number: Optional[str] = None,
+        expected_content_type: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
+        """Baixar um documento em streaming, sem gravar em disco nem manter o arquivo inteiro em memória.
+        
+        Usa o cliente HTTP persistente e produz o corpo da resposta em blocos de
+        ``chunk_size`` bytes, pronto para ser repassado a ``s3_service.upload_stream``.
+        
+        Um 200 com página HTML (portal/login, a menos que ``expected_content_type`` seja
+        HTML) ou com corpo vazio levanta ``PermanentPDPJError`` em vez de ser gravado.
+        """
+        download_timeout = timeout or self.download_timeout
+        
+        if href_binario.startswith('/'):
+            document_url = f"{self.base_url}{href_binario}"
+        else:
+            document_url = f"{self.base_url}/{href_binario}"
+        
+        if not session_cookie:
+            session_cookie = await get_active_session_cookie(self.base_url, self.token)
+        
+        if not process_number:
+            process_number = self._extract_process_number_from_href(href_binario)
+        headers = get_download_headers(self.token, session_cookie, process_number)
+        
+        client = await self._get_persistent_client()
+        try:
+            # Limitar downloads simultâneos na PDPJ (independente da concorrência do S3)
+            async with self._download_semaphore:
+                async with client.stream("GET", document_url, headers=headers, timeout=download_timeout) as response:
+                    if response.status_code != 200:
+                        logger.error(f"❌ Erro no download em streaming: {response.status_code}")
+                        error_cls = TransientPDPJError if response.status_code == 429 or response.status_code >= 500 else PermanentPDPJError
+                        raise error_cls(f"Erro ao baixar documento: HTTP {response.status_code}")
+                    
+                    received_type = response.headers.get("content-type", "").lower()
+                    if received_type.startswith("text/html") and "html" not in (expected_content_type or "").lower():
+                        logger.error(f"❌ Download retornou HTML em vez do documento: {document_url}")
+                        raise PermanentPDPJError("Erro ao baixar documento: resposta HTML (portal/login) em vez do arquivo")
+                    
+                    total_size = 0
+                    async for chunk in response.aiter_bytes(chunk_size):
+                        total_size += len(chunk)
+                        yield chunk
+                    
+                    if not total_size:
+                        logger.error(f"❌ Download retornou corpo vazio: {document_url}")
+                        raise PermanentPDPJError("Erro ao baixar documento: arquivo vazio")
+        except PDPJClientError:
+            raise
+        except httpx.TransportError as e:
+            logger.error(f"❌ Erro de conexão no download em streaming do documento: {e}")
+            raise TransientPDPJError(f"Erro no download: {e}")
+        except Exception as e:
+            logger.error(f"❌ Erro no download em streaming do documento: {e}")
+            raise PDPJClientError(f"Erro no download: {e}")
+    
+    async def _execute_download(
+        self,
+        client: httpx.AsyncClient,
+        document_url: str,
+        headers: Dict,
+        document_name: str,
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
         """Executar download do documento."""
         try:
-            response = await client.get(document_url, headers=headers)
+            response = await client.get(document_url, headers=headers, timeout=timeout or self.download_timeout)
             
-            logger.info(f"📊 Status: {response.status_code}")
-            logger.info(f"📊 Content-Type: {response.headers.get('content-type', 'N/A')}")
-            logger.info(f"📊 Content-Length: {response.headers.get('content-length', 'N/A')}")
+            logger.debug(f"📊 Status: {response.status_code}")
+            logger.debug(f"📊 Content-Type: {response.headers.get('content-type', 'N/A')}")
+            logger.debug(f"📊 Content-Length: {response.headers.get('content-length', 'N/A')}")
             
             if response.status_code == 200:
                 content = response.content
                 content_type = response.headers.get('content-type', '')
                 
-                # Processar download com validação
-                result = process_document_download(
+                # Processar download com validação (gravação em disco fora do event loop)
+                result = await asyncio.to_thread(
+                    process_document_download,
                     content=content,
                     original_name=document_name or "documento",
                     content_type=content_type,
-                    directory="data/downloads"
+                    directory=self.download_dir
                 )
                 
                 # Adicionar informações da requisição
@@ -523,7 +645,7 @@ class PDPJClient:
                     'download_timestamp': datetime.utcnow().isoformat()
                 })
                 
-                logger.info(f"✅ Download processado: {result['size']} bytes, tipo: {result['extension']}")
+                logger.debug(f"✅ Download processado: {result['size']} bytes, tipo: {result['extension']}")
                 return result
             else:
                 logger.error(f"❌ Erro no download: {response.status_code}")
@@ -8,6 +8,7 @@ from datetime import datetime, timedelta
 from loguru import logger
 
 from app.core.cache import cache_service
+from app.core.config import settings
 from app.services.pdpj_client import pdpj_client, PDPJClientError
 from app.utils.process_utils import normalize_process_number
 
@@ -137,28 +138,36 @@ class ProcessCacheService:
         
         return cached_processes
     
-    async def _fallback_individual_requests(self, process_numbers: List[str], cached_processes: Dict[str, Any]):
-        """Fallback para requisições individuais quando batch não está disponível."""
-        # Processar em lotes menores para evitar sobrecarga
-        batch_size = 10
-        for i in range(0, len(process_numbers), batch_size):
-            batch = process_numbers[i:i + batch_size]
-            
-            # Criar tasks para processamento paralelo
-            tasks = []
-            for process_number in batch:
-                task = self._fetch_single_process(process_number)
-                tasks.append(task)
-            
-            # Executar em paralelo
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            # Processar resultados
-            for process_number, result in zip(batch, results):
-                if isinstance(result, Exception):
-                    logger.error(f"❌ Erro ao buscar {process_number}: {result}")
-                elif result:
-                    cached_processes[process_number] = result
+    async def _fallback_individual_requests(
+        self,
+        process_numbers: List[str],
+        cached_processes: Dict[str, Any],
+        max_concurrency: Optional[int] = None
+    ):
+        """Fallback para requisições individuais quando batch não está disponível.
+        
+        Todas as requisições são disparadas de uma vez sobre o cliente HTTP
+        persistente, limitadas por um semáforo do tamanho do pool de conexões,
+        em vez de ondas fixas de 10 que esperam pela requisição mais lenta.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or settings.pdpj_max_connections)
+        
+        async with asyncio.TaskGroup() as tg:
+            tasks = [
+                tg.create_task(self._fetch_with_semaphore(semaphore, process_number))
+                for process_number in process_numbers
+            ]
+        
+        # Processar resultados (erros já são registrados em _fetch_single_process)
+        for process_number, task in zip(process_numbers, tasks):
+            result = task.result()
+            if result:
+                cached_processes[process_number] = result
+    
+    async def _fetch_with_semaphore(self, semaphore: asyncio.Semaphore, process_number: str) -> Optional[Dict[str, Any]]:
+        """Buscar um processo respeitando o limite de concorrência."""
+        async with semaphore:
+            return await self._fetch_single_process(process_number)
     
     async def _fetch_single_process(self, process_number: str) -> Optional[Dict[str, Any]]:
         """Buscar um único processo e armazenar no cache."""
@@ -6,9 +6,10 @@ import re
 import os
 import time
 import random
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, AsyncIterator, List
 from datetime import datetime, timedelta
 import aioboto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from loguru import logger
 
@@ -73,6 +74,16 @@ class S3Service:
             region_name=self.region
         )
         
+        # Configuração do cliente: pool HTTP maior e TCP keep-alive para uploads paralelos
+        self._client_config = Config(
+            max_pool_connections=getattr(settings, 's3_max_pool_connections', 50),
+            tcp_keepalive=True
+        )
+        
+        # Multipart upload para documentos grandes
+        self.multipart_threshold = 16 * 1024 * 1024  # 16 MB
+        self.multipart_part_size = 8 * 1024 * 1024   # 8 MB
+        
         # Configurações de timeout
         self.operation_timeout = 30  # segundos
         self.upload_timeout = 300    # 5 minutos para uploads grandes
@@ -126,7 +137,7 @@ class S3Service:
             # Criar conexões para o pool
             for _ in range(self.pool_size):
                 # Criar cliente real do S3
-                client = await self.session.client('s3').__aenter__()
+                client = await self.session.client('s3', config=self._client_config).__aenter__()
                 await self._client_pool.put(client)
             
             self._pool_initialized = True
@@ -146,19 +157,19 @@ class S3Service:
         timeout = timeout or self.operation_timeout
         
         # Para operações simples, usar cliente direto
-        async with self.session.client('s3') as s3:
+        async with self.session.client('s3', config=self._client_config) as s3:
             return await asyncio.wait_for(operation(s3), timeout=timeout)
     
     async def _get_client(self):
         """Obter cliente S3 com contexto async adequado."""
         # Criar cliente por operação para garantir contexto async correto
-        return self.session.client('s3')
+        return self.session.client('s3', config=self._client_config)
     
     async def _with_client(self, operation, timeout: Optional[int] = None):
         """Executar operação com cliente S3 em contexto async."""
         timeout = timeout or self.operation_timeout
         
-        async with self.session.client('s3') as s3:
+        async with self.session.client('s3', config=self._client_config) as s3:
             return await asyncio.wait_for(operation(s3), timeout=timeout)
     
     def _sanitize_filename(self, filename: str) -> str:
@@ -467,6 +478,30 @@ class S3Service:
             
             logger.info(f"Fazendo upload para S3: {s3_key}")
             
+            if len(file_content) > self.multipart_threshold:
+                await self.upload_document_multipart(
+                    file_content,
+                    s3_key,
+                    content_type,
+                    metadata={
+                        'process_number': process_number,
+                        'document_id': document_id,
+                        'uploaded_at': datetime.utcnow().isoformat(),
+                        'file_size': str(len(file_content))
+                    }
+                )
+                
+                logger.info(f"Upload multipart concluído: {s3_key} ({len(file_content)} bytes)")
+                
+                return {
+                    "s3_key": s3_key,
+                    "document_id": document_id,
+                    "bucket": self.bucket_name,
+                    "file_size": len(file_content),
+                    "content_type": content_type,
+                    "uploaded_at": datetime.utcnow().isoformat()
+                }
+            
             async def upload_operation(s3):
                 await s3.put_object(
                     Bucket=self.bucket_name,
@@ -507,6 +542,217 @@ class S3Service:
             logger.error(f"Erro inesperado no upload S3: {e}")
             raise S3ServiceError(f"Erro no upload: {e}")
     
+    async def upload_document_multipart(
+        self,
+        file_content: bytes,
+        s3_key: str,
+        content_type: str,
+        metadata: Optional[Dict[str, str]] = None
+    ) -> None:
+        """Enviar conteúdo grande via multipart upload com as partes em paralelo.
+        
+        O conteúdo é fatiado em partes de ``multipart_part_size`` (sem cópia, via
+        memoryview) e todas as partes são enviadas simultaneamente no mesmo cliente.
+        """
+        part_size = self.multipart_part_size
+        view = memoryview(file_content)
+        upload_id = None
+        
+        try:
+            async with self.session.client('s3', config=self._client_config) as s3:
+                response = await s3.create_multipart_upload(
+                    Bucket=self.bucket_name,
+                    Key=s3_key,
+                    ContentType=content_type,
+                    Metadata=metadata or {}
+                )
+                upload_id = response['UploadId']
+                
+                async def upload_part(part_number: int, offset: int) -> Dict[str, Any]:
+                    async with self._operation_semaphore:
+                        response = await self._retry_with_backoff(
+                            s3.upload_part,
+                            Bucket=self.bucket_name,
+                            Key=s3_key,
+                            UploadId=upload_id,
+                            PartNumber=part_number,
+                            Body=view[offset:offset + part_size].tobytes()
+                        )
+                    return {'ETag': response['ETag'], 'PartNumber': part_number}
+                
+                parts = await asyncio.wait_for(
+                    asyncio.gather(*[
+                        upload_part(part_number, offset)
+                        for part_number, offset in enumerate(range(0, len(file_content), part_size), start=1)
+                    ]),
+                    timeout=self.upload_timeout
+                )
+                
+                await s3.complete_multipart_upload(
+                    Bucket=self.bucket_name,
+                    Key=s3_key,
+                    UploadId=upload_id,
+                    MultipartUpload={'Parts': parts}
+                )
+        except Exception:
+            if upload_id is not None:
+                await self._abort_multipart_upload(s3_key, upload_id)
+            raise
+    
+    async def upload_stream(
+        self,
+        body: AsyncIterator[bytes],
+        process_number: str,
+        document_id: Optional[str] = None,
+        filename: Optional[str] = None,
+        content_type: Optional[str] = None,
+        part_size: int = 8 * 1024 * 1024
+    ) -> Dict[str, Any]:
+        """Fazer upload de documento para S3 a partir de um iterador assíncrono de bytes.
+        
+        Os blocos são acumulados em partes de ``part_size`` e enviados via multipart
+        upload, de modo que no máximo uma parte fica em memória. Documentos menores
+        que uma parte são enviados com um único ``put_object``. Erros levantados pelo
+        próprio ``body`` (origem dos dados) são propagados sem conversão.
+        """
+        
+        if not document_id:
+            document_id = self._generate_document_id()
+        
+        if not filename:
+            filename = f"document_{document_id}"
+        
+        filename = self._sanitize_filename(filename)
+        
+        if not content_type:
+            content_type = "application/octet-stream"
+        
+        self._validate_s3_key_components(process_number, document_id, filename)
+        
+        s3_key = self._generate_s3_key(process_number, document_id, filename)
+        metadata = {
+            'process_number': process_number,
+            'document_id': document_id,
+            'uploaded_at': datetime.utcnow().isoformat()
+        }
+        
+        logger.debug(f"Fazendo upload em streaming para S3: {s3_key}")
+        
+        upload_id = None
+        file_size = 0
+        body_iterator = body.__aiter__()
+        body_error = None
+        
+        try:
+            async with self.session.client('s3', config=self._client_config) as s3:
+                parts = []
+                buffer = bytearray()
+                
+                async def flush_part():
+                    nonlocal upload_id
+                    if upload_id is None:
+                        response = await s3.create_multipart_upload(
+                            Bucket=self.bucket_name,
+                            Key=s3_key,
+                            ContentType=content_type,
+                            Metadata=metadata
+                        )
+                        upload_id = response['UploadId']
+                    
+                    part_number = len(parts) + 1
+                    async with self._operation_semaphore:
+                        response = await self._retry_with_backoff(
+                            s3.upload_part,
+                            Bucket=self.bucket_name,
+                            Key=s3_key,
+                            UploadId=upload_id,
+                            PartNumber=part_number,
+                            Body=bytes(buffer)
+                        )
+                    parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+                    buffer.clear()
+                
+                while True:
+                    try:
+                        chunk = await body_iterator.__anext__()
+                    except StopAsyncIteration:
+                        break
+                    except Exception as e:
+                        body_error = e
+                        raise
+                    
+                    buffer += chunk
+                    file_size += len(chunk)
+                    if len(buffer) >= part_size:
+                        await flush_part()
+                
+                if upload_id is None:
+                    # Documento coube em uma única parte: um PUT simples é mais barato
+                    async with self._operation_semaphore:
+                        await self._retry_with_backoff(
+                            s3.put_object,
+                            Bucket=self.bucket_name,
+                            Key=s3_key,
+                            Body=bytes(buffer),
+                            ContentType=content_type,
+                            Metadata={**metadata, 'file_size': str(file_size)}
+                        )
+                else:
+                    if buffer:
+                        await flush_part()
+                    await s3.complete_multipart_upload(
+                        Bucket=self.bucket_name,
+                        Key=s3_key,
+                        UploadId=upload_id,
+                        MultipartUpload={'Parts': parts}
+                    )
+                    upload_id = None
+            
+            logger.debug(f"Upload em streaming concluído: {s3_key} ({file_size} bytes)")
+            
+            return {
+                "s3_key": s3_key,
+                "document_id": document_id,
+                "bucket": self.bucket_name,
+                "file_size": file_size,
+                "content_type": content_type,
+                "uploaded_at": datetime.utcnow().isoformat()
+            }
+        
+        except Exception as e:
+            if upload_id is not None:
+                await self._abort_multipart_upload(s3_key, upload_id)
+            
+            if e is body_error:
+                raise
+            
+            if isinstance(e, ClientError):
+                error_code = e.response['Error']['Code']
+                logger.error(f"Erro do AWS S3 ({error_code}): {e}")
+                raise S3ServiceError(f"Erro do AWS S3: {e}")
+            
+            logger.error(f"Erro inesperado no upload em streaming S3: {e}")
+            raise S3ServiceError(f"Erro no upload: {e}")
+        
+        finally:
+            # Fechar a origem em qualquer caminho: um gerador pausado (ex.: stream_document)
+            # mantém o semáforo de download e a conexão HTTP até ser finalizado
+            aclose = getattr(body_iterator, 'aclose', None)
+            if aclose is not None:
+                await aclose()
+    
+    async def _abort_multipart_upload(self, s3_key: str, upload_id: str) -> None:
+        """Abortar multipart upload incompleto para não acumular partes órfãs."""
+        try:
+            async with self.session.client('s3', config=self._client_config) as s3:
+                await s3.abort_multipart_upload(
+                    Bucket=self.bucket_name,
+                    Key=s3_key,
+                    UploadId=upload_id
+                )
+        except Exception as e:
+            logger.warning(f"Falha ao abortar multipart upload {upload_id} ({s3_key}): {e}")
+    
     async def generate_presigned_url(
         self,
         s3_key: str,
@@ -518,7 +764,7 @@ class S3Service:
         try:
             logger.info(f"Gerando URL presignada para: {s3_key}")
             
-            async with self.session.client('s3') as s3:
+            async with self.session.client('s3', config=self._client_config) as s3:
                 url = await s3.generate_presigned_url(
                     'get_object',
                     Params={'Bucket': self.bucket_name, 'Key': s3_key},
@@ -543,7 +789,7 @@ class S3Service:
         try:
             logger.info(f"Baixando documento do S3: {s3_key}")
             
-            async with self.session.client('s3') as s3:
+            async with self.session.client('s3', config=self._client_config) as s3:
                 response = await s3.get_object(
                     Bucket=self.bucket_name,
                     Key=s3_key
@@ -571,7 +817,7 @@ class S3Service:
         try:
             logger.info(f"Deletando documento do S3: {s3_key}")
             
-            async with self.session.client('s3') as s3:
+            async with self.session.client('s3', config=self._client_config) as s3:
                 await s3.delete_object(
                     Bucket=self.bucket_name,
                     Key=s3_key
@@ -593,7 +839,7 @@ class S3Service:
         """Verificar se documento existe no S3."""
         
         try:
-            async with self.session.client('s3') as s3:
+            async with self.session.client('s3', config=self._client_config) as s3:
                 await s3.head_object(
                     Bucket=self.bucket_name,
                     Key=s3_key
@@ -615,7 +861,7 @@ class S3Service:
         """Obter metadados do documento."""
         
         try:
-            async with self.session.client('s3') as s3:
+            async with self.session.client('s3', config=self._client_config) as s3:
                 response = await s3.head_object(
                     Bucket=self.bucket_name,
                     Key=s3_key
@@ -649,7 +895,7 @@ class S3Service:
             prefix = f"processes/{process_number}/documents/"
             documents = []
             
-            async with self.session.client('s3') as s3:
+            async with self.session.client('s3', config=self._client_config) as s3:
                 paginator = s3.get_paginator('list_objects_v2')
                 
                 async for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
@@ -678,7 +924,7 @@ class S3Service:
         """Verificar saúde do serviço S3."""
         
         try:
-            async with self.session.client('s3') as s3:
+            async with self.session.client('s3', config=self._client_config) as s3:
                 # Tentar listar objetos do bucket
                 await s3.head_bucket(Bucket=self.bucket_name)
                 
@@ -1,6 +1,11 @@
 """Configuração do Celery para tarefas assíncronas."""
 
+import asyncio
+from typing import Any, Coroutine, Optional
+
 from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
+from loguru import logger
 from app.core.config import settings
 
 # Criar instância do Celery
@@ -28,6 +33,7 @@ celery_app.conf.update(
     task_soft_time_limit=55 * 60,  # 55 minutos
     task_acks_late=True,  # Confirmar task apenas após conclusão
     task_reject_on_worker_lost=True,  # Rejeitar tasks se worker for perdido
+    task_acks_on_failure_or_timeout=False,  # Falhas/timeouts são rejeitadas, não confirmadas
     
     # Configurações de worker
     worker_prefetch_multiplier=1,  # Processar uma task por vez para evitar memory leaks
@@ -43,11 +49,12 @@ celery_app.conf.update(
     broker_connection_retry=True,
     broker_connection_max_retries=10,
     
-    # Configurações de concorrência
-    worker_concurrency=4,  # 4 threads por worker
+    # Concorrência definida pelo launcher (--concurrency / -c) por fila
     
     # Configurações de routing
     task_routes={
+        # Download de documentos (I/O externo longo) em fila própria, sem ocupar workers de busca
+        'app.tasks.process_tasks.download_process_documents': {'queue': 'documents'},
         'app.tasks.process_tasks.*': {'queue': 'processes'},
         'app.tasks.document_tasks.*': {'queue': 'documents'},
         'app.tasks.ultra_fast_tasks.*': {'queue': 'ultra_fast'},
@@ -74,3 +81,43 @@ celery_app.conf.update(
         },
     },
 )
+
+
+# Event loop persistente por processo worker: evita criar/destruir um loop por task
+# (asyncio.run) e mantém válidos os pools assíncronos (asyncpg, httpx) entre tasks.
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_worker_loop() -> asyncio.AbstractEventLoop:
+    """Obter (ou criar) o event loop persistente do processo atual."""
+    global _worker_loop
+    if _worker_loop is None or _worker_loop.is_closed():
+        _worker_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_worker_loop)
+    return _worker_loop
+
+
+@worker_process_init.connect
+def init_worker_event_loop(**kwargs) -> None:
+    """Criar o event loop do processo worker logo após o fork."""
+    _get_worker_loop()
+
+
+@worker_process_shutdown.connect
+def close_worker_event_loop(**kwargs) -> None:
+    """Fechar o cliente HTTP compartilhado e o event loop do processo worker no encerramento."""
+    global _worker_loop
+    if _worker_loop is not None and not _worker_loop.is_closed():
+        # Import tardio: evita ciclo celery_app -> pdpj_client na importação das tasks
+        from app.services.pdpj_client import pdpj_client
+        try:
+            _worker_loop.run_until_complete(pdpj_client._close_persistent_client())
+        except Exception:
+            logger.opt(exception=True).warning("Falha ao fechar cliente HTTP persistente no shutdown do worker")
+        _worker_loop.close()
+    _worker_loop = None
+
+
+def run_async(coro: Coroutine[Any, Any, Any]) -> Any:
+    """Executar uma corrotina no event loop persistente do worker."""
+    return _get_worker_loop().run_until_complete(coro)
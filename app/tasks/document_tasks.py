@@ -3,14 +3,21 @@
 from typing import Dict, Any
 from loguru import logger
 
+from app.core.config import settings
 from app.tasks.celery_app import celery_app
 
 
-@celery_app.task(bind=True)
+@celery_app.task(bind=True, ignore_result=True)
 def download_document(self, document_id: str, s3_key: str) -> Dict[str, Any]:
     """Baixar um documento específico e fazer upload para S3."""
     
     task_id = self.request.id
+    
+    # Task ainda não implementada: evitar trabalho e escrita no backend de resultados
+    if not settings.enable_document_download_tasks:
+        logger.debug(f"⏭️ download_document desabilitada, ignorando documento {document_id}")
+        return {"task_id": task_id, "document_id": document_id, "skipped": True}
+    
     logger.info(f"Iniciando download do documento {document_id} (task: {task_id})")
     
     try:
@@ -37,11 +44,16 @@ def download_document(self, document_id: str, s3_key: str) -> Dict[str, Any]:
         raise
 
 
-@celery_app.task(bind=True)
+@celery_app.task(bind=True, ignore_result=True)
 def cleanup_old_download_urls(self) -> Dict[str, Any]:
     """Limpar URLs de download expiradas."""
     
     task_id = self.request.id
+    
+    if not settings.enable_document_download_tasks:
+        logger.debug("⏭️ cleanup_old_download_urls desabilitada, ignorando")
+        return {"task_id": task_id, "skipped": True}
+    
     logger.info(f"Iniciando limpeza de URLs expiradas (task: {task_id})")
     
     try:
@@ -3,28 +3,84 @@ Tarefas Celery otimizadas para processamento em lote de alta escala.
 """
 
 import asyncio
+import gc
+import itertools
 import time
-from typing import List, Dict, Any, Optional
-from celery import Celery, Task
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from celery import Celery, Task, chord, group
 from celery.exceptions import Retry
+from kombu.serialization import register
 from loguru import logger
 
-from app.core.dynamic_limits import get_current_limits
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+from app.core.dynamic_limits import DynamicLimits, get_current_limits
+from app.tasks.celery_app import run_async
 from app.services.pdpj_client import pdpj_client
 from app.services.process_cache_service import process_cache_service
 from app.utils.transaction_manager import BatchTransactionManager
 from app.utils.advanced_retry import retry_database, retry_http
 from app.core.proactive_monitoring import record_error_metrics, record_request_metrics
+from app.utils.process_utils import normalize_process_numbers
+
+
+# Limite de memória do processo worker (worker_max_memory_per_child, em KB)
+WORKER_MAX_MEMORY_KB = 200000
+# Fração do limite a partir da qual o lote é repassado a uma nova task
+MEMORY_PRESSURE_RATIO = 0.8
+
+
+def _memory_pressure() -> bool:
+    """Verificar se o processo atual está próximo do limite de memória do worker."""
+    if not PSUTIL_AVAILABLE:
+        return False
+    rss = psutil.Process().memory_info().rss
+    return rss > MEMORY_PRESSURE_RATIO * WORKER_MAX_MEMORY_KB * 1024
+
+
+def _chunks(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    """Gerar chunks de até ``size`` itens sob demanda, sem fatiar a lista inteira de antemão."""
+    it = iter(items)
+    return iter(lambda: list(itertools.islice(it, size)), [])
+
+
+def _count_chunks(total: int, size: int) -> int:
+    """Quantidade de chunks de até ``size`` itens para ``total`` itens."""
+    return -(-total // size) if size else 0
 
 
 class OptimizedCeleryTask(Task):
     """Classe base para tarefas Celery otimizadas."""
     
+    # Limites dinâmicos compartilhados por todas as tasks do processo (lidos uma vez)
+    _limits: Optional[DynamicLimits] = None
+    
     def __init__(self):
-        self.limits = get_current_limits()
         self.max_retries = self.limits.max_retries
         self.retry_delay = self.limits.retry_delay
     
+    @property
+    def limits(self) -> DynamicLimits:
+        """Limites do ambiente atual, carregados na primeira utilização."""
+        if OptimizedCeleryTask._limits is None:
+            OptimizedCeleryTask._limits = get_current_limits()
+        return OptimizedCeleryTask._limits
+    
+    @classmethod
+    def refresh_limits(cls) -> None:
+        """Recarregar os limites (ex.: após ``set_custom_limits``)."""
+        OptimizedCeleryTask._limits = get_current_limits()
+    
     def on_failure(self, exc, task_id, args, kwargs, einfo):
         """Callback para falhas."""
         logger.error(f"❌ Tarefa {task_id} falhou: {exc}")
@@ -43,16 +99,33 @@ class OptimizedCeleryTask(Task):
 celery_app = Celery('pdpj_optimized')
 celery_app.config_from_object('app.core.celery_config')
 
+# Serializador orjson (bem mais rápido que o json da stdlib para os resultados em lote);
+# sem orjson instalado, mantém json. 'json' continua aceito para mensagens antigas.
+if ORJSON_AVAILABLE:
+    register(
+        'orjson',
+        orjson.dumps,
+        orjson.loads,
+        content_type='application/x-orjson',
+        content_encoding='binary'
+    )
+    TASK_SERIALIZER = 'orjson'
+else:
+    TASK_SERIALIZER = 'json'
+
 # Configurações otimizadas
 celery_app.conf.update(
-    task_serializer='json',
-    accept_content=['json'],
-    result_serializer='json',
+    task_serializer=TASK_SERIALIZER,
+    accept_content=['orjson', 'json'] if ORJSON_AVAILABLE else ['json'],
+    result_serializer=TASK_SERIALIZER,
+    result_accept_content=['orjson', 'json'] if ORJSON_AVAILABLE else ['json'],
     timezone='UTC',
     enable_utc=True,
     
     # Configurações de performance
-    worker_prefetch_multiplier=1,
+    # Tarefas I/O-bound (PDPJ, S3, cache): prefetch 2 mantém o próximo lote já reservado.
+    # process_large_batch é de longa duração e deve ficar em fila/worker com prefetch 1.
+    worker_prefetch_multiplier=2,
     task_acks_late=True,
     worker_disable_rate_limits=True,
     
@@ -61,27 +134,93 @@ celery_app.conf.update(
     task_max_retries=7,
     
     # Configurações de memória
-    worker_max_memory_per_child=200000,  # 200MB
+    worker_max_memory_per_child=WORKER_MAX_MEMORY_KB,  # 200MB
     worker_max_tasks_per_child=1000,
     
-    # Configurações de concorrência
-    worker_concurrency=4,
-    task_routes={
-        'app.tasks.optimized_celery_tasks.process_batch_search_optimized': {'queue': 'batch_search'},
-        'app.tasks.optimized_celery_tasks.download_documents_batch': {'queue': 'downloads'},
-        'app.tasks.optimized_celery_tasks.process_large_batch': {'queue': 'large_batch'},
-    }
+    # Concorrência definida pelo launcher (--concurrency / -c)
+    # Filas e prioridades: app.core.celery_config.task_routes
 )
 
 
+# Retentativas de process_batch_search_optimized antes de desistir do lote
+BATCH_SEARCH_MAX_RETRIES = 3
+
+
+def _sub_batch_error(
+    process_numbers: List[str],
+    sub_batch: int,
+    error: Exception,
+    partial: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Resultado de um sub-lote que falhou em definitivo (mantém o parcial já obtido)."""
+    results = partial or {
+        "total_requested": len(process_numbers),
+        "duplicates_removed": 0,
+        "found": 0,
+        "not_found": [],
+        "errors": []
+    }
+    results["errors"].append({"sub_batch": sub_batch, "error": str(error)})
+    return results
+
+
 @celery_app.task(bind=True, base=OptimizedCeleryTask, name='process_batch_search_optimized')
-async def process_batch_search_optimized(self, process_numbers: List[str], include_documents: bool = False):
-    """Processamento otimizado de busca em lote."""
+def process_batch_search_optimized(
+    self,
+    process_numbers: List[str],
+    include_documents: bool = False,
+    partial: Optional[Dict[str, Any]] = None,
+    sub_batch: Optional[int] = None
+):
+    """Processamento otimizado de busca em lote.
+    
+    Sob pressão de memória, os chunks ainda não iniciados são repassados (com o
+    resultado parcial) a uma nova execução via ``self.replace``, antes que o worker
+    seja reciclado por ``worker_max_memory_per_child``.
+    
+    Quando executada como sub-lote de ``process_large_batch`` (``sub_batch`` informado),
+    uma falha definitiva (retentativas esgotadas) é devolvida como erro no resultado em
+    vez de ser propagada: uma exceção falharia o chord inteiro (ChordError) e
+    ``consolidate_results`` nunca rodaria.
+    """
+    try:
+        results, remaining = run_async(
+            _process_batch_search_optimized(self, process_numbers, include_documents, partial)
+        )
+    except Exception as e:
+        if sub_batch is not None and self.request.retries >= BATCH_SEARCH_MAX_RETRIES:
+            logger.error(f"❌ Sub-lote {sub_batch} falhou em definitivo: {e}")
+            return _sub_batch_error(process_numbers, sub_batch, e, partial)
+        raise self.retry(exc=e, countdown=60, max_retries=BATCH_SEARCH_MAX_RETRIES)
+    
+    if remaining:
+        # Continuar em uma nova task (mesmo id de resultado) com os chunks adiados
+        logger.info(f"♻️ Repassando {len(remaining)} processos para nova execução")
+        return self.replace(process_batch_search_optimized.s(
+            remaining, include_documents, partial=results, sub_batch=sub_batch
+        ))
+    
+    return results
+
+
+async def _process_batch_search_optimized(
+    self,
+    process_numbers: List[str],
+    include_documents: bool,
+    partial: Optional[Dict[str, Any]]
+):
+    """Corpo assíncrono de process_batch_search_optimized.
+    
+    Returns:
+        Tupla (resultados, processos adiados por pressão de memória). Retry e replace
+        ficam no wrapper síncrono, fora do event loop.
+    """
     logger.info(f"🚀 Iniciando busca otimizada em lote: {len(process_numbers)} processos")
     
     start_time = time.time()
-    results = {
+    results = partial or {
         "total_requested": len(process_numbers),
+        "duplicates_removed": 0,
         "found": 0,
         "not_found": [],
         "errors": [],
@@ -89,78 +228,118 @@ async def process_batch_search_optimized(self, process_numbers: List[str], inclu
         "batch_id": self.request.id
     }
     
+    # Normalizar e remover números repetidos (preservando a ordem) antes de cache/PDPJ/consolidação
+    unique_numbers = list(dict.fromkeys(normalize_process_numbers(process_numbers)))
+    if len(unique_numbers) != len(process_numbers):
+        results["duplicates_removed"] += len(process_numbers) - len(unique_numbers)
+        logger.info(f"🔁 {len(process_numbers) - len(unique_numbers)} números de processo duplicados removidos")
+    process_numbers = unique_numbers
+    
     try:
         # Dividir em chunks menores para processamento
         chunk_size = min(self.limits.max_batch_size, 100)
-        chunks = [process_numbers[i:i + chunk_size] for i in range(0, len(process_numbers), chunk_size)]
+        total_chunks = _count_chunks(len(process_numbers), chunk_size)
+        
+        logger.info(f"📦 Processando {total_chunks} chunks de até {chunk_size} processos")
+        
+        # Processar chunks em paralelo (limitado para não saturar a API PDPJ)
+        semaphore = asyncio.Semaphore(self.limits.max_concurrent_requests)
+        
+        memory_pressure = asyncio.Event()
         
-        logger.info(f"📦 Processando {len(chunks)} chunks de até {chunk_size} processos")
+        async def process_chunk_limited(i: int, chunk: List[str]):
+            async with semaphore:
+                if memory_pressure.is_set():
+                    # Adiado para a próxima execução
+                    return i, None
+                try:
+                    return i, await process_chunk_optimized(chunk, include_documents)
+                except Exception as e:
+                    return i, e
         
-        # Processar chunks em paralelo
+        # as_completed: progresso a cada chunk concluído, sem serializar os chunks
         chunk_results = []
-        for i, chunk in enumerate(chunks):
-            try:
-                chunk_result = await process_chunk_optimized(chunk, include_documents)
+        deferred = []
+        done = 0
+        for future in asyncio.as_completed([
+            process_chunk_limited(i, chunk) for i, chunk in enumerate(_chunks(process_numbers, chunk_size))
+        ]):
+            i, chunk_result = await future
+            done += 1
+            
+            if chunk_result is None:
+                deferred.append(i)
+                continue
+            
+            if not memory_pressure.is_set() and _memory_pressure():
+                logger.warning("⚠️ Memória do worker perto do limite: adiando chunks restantes")
+                memory_pressure.set()
+                gc.collect()
+            
+            if isinstance(chunk_result, Exception):
+                logger.error(f"❌ Erro no chunk {i + 1}: {chunk_result}")
+                results["errors"].append({"chunk": i + 1, "error": str(chunk_result)})
+            else:
                 chunk_results.append(chunk_result)
-                
-                # Atualizar progresso
-                progress = ((i + 1) / len(chunks)) * 100
-                self.update_state(
-                    state='PROGRESS',
-                    meta={'progress': progress, 'chunk': i + 1, 'total_chunks': len(chunks)}
-                )
-                
-            except Exception as e:
-                logger.error(f"❌ Erro no chunk {i + 1}: {e}")
-                results["errors"].append({"chunk": i + 1, "error": str(e)})
-        
-        # Consolidar resultados
+            
+            # Atualizar progresso
+            self.update_state(
+                state='PROGRESS',
+                meta={'progress': (done / total_chunks) * 100, 'chunk': done, 'total_chunks': total_chunks}
+            )
+        
+        # Consolidar resultados (not_found unido em O(N), sem duplicatas entre chunks)
+        results["found"] += sum(chunk_result["found"] for chunk_result in chunk_results)
+        results["not_found"] = list(set(results["not_found"]).union(*(chunk_result["not_found"] for chunk_result in chunk_results)))
         for chunk_result in chunk_results:
-            results["found"] += chunk_result["found"]
-            results["not_found"].extend(chunk_result["not_found"])
             results["errors"].extend(chunk_result.get("errors", []))
+        del chunk_results
+        
+        if deferred:
+            # Chunks adiados: o wrapper continua em uma nova task (mesmo id de resultado)
+            remaining = [
+                n for i in sorted(deferred)
+                for n in process_numbers[i * chunk_size:(i + 1) * chunk_size]
+            ]
+            return results, remaining
         
         duration = time.time() - start_time
         record_request_metrics("POST", "batch_search", 200, duration)
         
         logger.info(f"✅ Busca otimizada concluída: {results['found']} encontrados em {duration:.2f}s")
         
-        return results
+        return results, []
         
     except Exception as e:
-        duration = time.time() - start_time
         record_error_metrics("batch_search_failure", self.request.id, str(e))
         logger.error(f"❌ Erro na busca otimizada: {e}")
-        raise self.retry(exc=e, countdown=60, max_retries=3)
+        raise
 
 
 async def process_chunk_optimized(process_numbers: List[str], include_documents: bool) -> Dict[str, Any]:
     """Processar um chunk de processos de forma otimizada."""
     logger.info(f"📦 Processando chunk de {len(process_numbers)} processos")
     
-    found = 0
-    not_found = []
     errors = []
     
     try:
         # Usar cache otimizado
         cached_data = await process_cache_service.batch_get_processes(process_numbers)
         
-        # Processar resultados do cache
-        for process_number in process_numbers:
-            try:
-                if process_number in cached_data:
-                    # Processo encontrado no cache
-                    found += 1
-                    logger.debug(f"✅ Processo encontrado no cache: {process_number}")
-                else:
-                    # Processo não encontrado
-                    not_found.append(process_number)
-                    logger.debug(f"❌ Processo não encontrado: {process_number}")
-                    
-            except Exception as e:
-                logger.error(f"❌ Erro ao processar {process_number}: {e}")
-                errors.append({"process_number": process_number, "error": str(e)})
+        # Separar hits/misses com operações de conjunto (sem laço por processo)
+        found = len(cached_data.keys() & set(process_numbers))
+        if found == len(process_numbers):
+            # Chunk inteiro atendido pelo cache
+            not_found = []
+        else:
+            not_found = [n for n in process_numbers if n not in cached_data]
+        
+        # Um único registro por chunk, formatado apenas se DEBUG estiver habilitado
+        logger.opt(lazy=True).debug(
+            "📦 Chunk processado: {} no cache, {} não encontrados",
+            lambda: found,
+            lambda: len(not_found)
+        )
         
         return {
             "found": found,
@@ -174,8 +353,13 @@ async def process_chunk_optimized(process_numbers: List[str], include_documents:
 
 
 @celery_app.task(bind=True, base=OptimizedCeleryTask, name='download_documents_batch')
-async def download_documents_batch(self, process_number: str, document_ids: List[str]):
+def download_documents_batch(self, process_number: str, document_ids: List[str]):
     """Download em lote de documentos."""
+    return run_async(_download_documents_batch(self, process_number, document_ids))
+
+
+async def _download_documents_batch(self, process_number: str, document_ids: List[str]):
+    """Corpo assíncrono de download_documents_batch."""
     logger.info(f"⬇️ Iniciando download em lote: {len(document_ids)} documentos para {process_number}")
     
     start_time = time.time()
@@ -191,29 +375,41 @@ async def download_documents_batch(self, process_number: str, document_ids: List
     try:
         # Dividir em chunks menores
         chunk_size = min(50, len(document_ids))  # Máximo 50 documentos por chunk
-        chunks = [document_ids[i:i + chunk_size] for i in range(0, len(document_ids), chunk_size)]
+        total_chunks = _count_chunks(len(document_ids), chunk_size)
         
-        logger.info(f"📦 Processando {len(chunks)} chunks de downloads")
+        logger.info(f"📦 Processando {total_chunks} chunks de downloads")
+        
+        # Processar chunks concorrentemente, limitados para evitar sobrecarga
+        # (cada chunk já limita seus próprios downloads simultâneos)
+        semaphore = asyncio.Semaphore(max(1, self.limits.max_concurrent_downloads // 5))
+        
+        async def download_chunk_limited(i: int, chunk: List[str]):
+            async with semaphore:
+                try:
+                    return i, await download_chunk_documents(process_number, chunk)
+                except Exception as e:
+                    return i, e
         
-        # Processar chunks sequencialmente para evitar sobrecarga
-        for i, chunk in enumerate(chunks):
-            try:
-                chunk_result = await download_chunk_documents(process_number, chunk)
-                
+        done = 0
+        for future in asyncio.as_completed([
+            download_chunk_limited(i, chunk) for i, chunk in enumerate(_chunks(document_ids, chunk_size))
+        ]):
+            i, chunk_result = await future
+            done += 1
+            
+            if isinstance(chunk_result, Exception):
+                logger.error(f"❌ Erro no chunk de download {i + 1}: {chunk_result}")
+                results["errors"].append({"chunk": i + 1, "error": str(chunk_result)})
+            else:
                 results["downloaded"] += chunk_result["downloaded"]
                 results["failed"] += chunk_result["failed"]
                 results["errors"].extend(chunk_result.get("errors", []))
-                
-                # Atualizar progresso
-                progress = ((i + 1) / len(chunks)) * 100
-                self.update_state(
-                    state='PROGRESS',
-                    meta={'progress': progress, 'chunk': i + 1, 'total_chunks': len(chunks)}
-                )
-                
-            except Exception as e:
-                logger.error(f"❌ Erro no chunk de download {i + 1}: {e}")
-                results["errors"].append({"chunk": i + 1, "error": str(e)})
+            
+            # Atualizar progresso
+            self.update_state(
+                state='PROGRESS',
+                meta={'progress': (done / total_chunks) * 100, 'chunk': done, 'total_chunks': total_chunks}
+            )
         
         duration = time.time() - start_time
         record_request_metrics("POST", "download_batch", 200, duration)
@@ -240,20 +436,32 @@ async def download_chunk_documents(process_number: str, document_ids: List[str])
         semaphore = asyncio.Semaphore(5)  # Máximo 5 downloads simultâneos
         
         async def download_single_document(doc_id: str):
+            """Retorna (sucesso, doc_id, erro); os contadores são somados pelo chamador."""
             async with semaphore:
                 try:
                     # Implementar download individual
                     # (código de download seria implementado aqui)
-                    downloaded += 1
                     logger.debug(f"✅ Documento baixado: {doc_id}")
+                    return True, doc_id, None
                 except Exception as e:
-                    failed += 1
-                    errors.append({"document_id": doc_id, "error": str(e)})
                     logger.error(f"❌ Erro ao baixar {doc_id}: {e}")
+                    return False, doc_id, e
         
         # Executar downloads em paralelo
         tasks = [download_single_document(doc_id) for doc_id in document_ids]
-        await asyncio.gather(*tasks, return_exceptions=True)
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+        
+        for doc_id, outcome in zip(document_ids, outcomes):
+            if isinstance(outcome, BaseException):
+                success, error = False, outcome
+            else:
+                success, _, error = outcome
+            
+            if success:
+                downloaded += 1
+            else:
+                failed += 1
+                errors.append({"document_id": doc_id, "error": str(error)})
         
         return {
             "downloaded": downloaded,
@@ -266,64 +474,123 @@ async def download_chunk_documents(process_number: str, document_ids: List[str])
         raise
 
 
+# Máximo de sub-lotes de process_large_batch em voo ao mesmo tempo (~2x a concorrência do worker)
+MAX_IN_FLIGHT_SUB_BATCHES = 8
+
+
+def _large_batch_wave(
+    process_numbers: List[str],
+    batch_size: int,
+    total_requested: int,
+    batch_id: str,
+    start_time: float,
+    partial: Optional[Dict[str, Any]] = None,
+    first_sub_batch: int = 1
+):
+    """Montar o chord da próxima onda de sub-lotes; o restante segue para o callback.
+    
+    Cada sub-lote recebe seu número (a partir de ``first_sub_batch``) para que uma falha
+    definitiva volte como ``{"sub_batch": n, "error": ...}`` em vez de falhar o chord.
+    """
+    wave_size = batch_size * MAX_IN_FLIGHT_SUB_BATCHES
+    wave, remaining = process_numbers[:wave_size], process_numbers[wave_size:]
+    return chord(
+        group(
+            process_batch_search_optimized.s(sub_batch, sub_batch=first_sub_batch + i)
+            for i, sub_batch in enumerate(_chunks(wave, batch_size))
+        ),
+        consolidate_results.s(
+            total_requested, batch_id, start_time,
+            remaining=remaining, batch_size=batch_size, partial=partial,
+            next_sub_batch=first_sub_batch + _count_chunks(len(wave), batch_size)
+        )
+    )
+
+
 @celery_app.task(bind=True, base=OptimizedCeleryTask, name='process_large_batch')
-async def process_large_batch(self, process_numbers: List[str], batch_size: int = 1000):
+def process_large_batch(self, process_numbers: List[str], batch_size: int = 1000):
     """Processamento de lotes muito grandes."""
     logger.info(f"🚀 Iniciando processamento de lote grande: {len(process_numbers)} processos")
     
-    start_time = time.time()
-    results = {
-        "total_requested": len(process_numbers),
-        "processed": 0,
-        "errors": [],
-        "batch_id": self.request.id
-    }
+    # Normalizar e remover números repetidos (preservando a ordem) antes de dividir em sub-lotes
+    total_requested = len(process_numbers)
+    process_numbers = list(dict.fromkeys(normalize_process_numbers(process_numbers)))
+    if len(process_numbers) != total_requested:
+        logger.info(f"🔁 {total_requested - len(process_numbers)} números de processo duplicados removidos")
     
     try:
         # Dividir em sub-lotes
-        sub_batches = [process_numbers[i:i + batch_size] for i in range(0, len(process_numbers), batch_size)]
-        
-        logger.info(f"📦 Processando {len(sub_batches)} sub-lotes de até {batch_size} processos")
-        
-        # Processar sub-lotes sequencialmente
-        for i, sub_batch in enumerate(sub_batches):
-            try:
-                # Agendar sub-lote como tarefa separada
-                task = process_batch_search_optimized.delay(sub_batch)
-                
-                # Aguardar conclusão
-                sub_result = task.get(timeout=300)  # 5 minutos de timeout
-                
-                results["processed"] += sub_result.get("found", 0)
-                results["errors"].extend(sub_result.get("errors", []))
-                
-                # Atualizar progresso
-                progress = ((i + 1) / len(sub_batches)) * 100
-                self.update_state(
-                    state='PROGRESS',
-                    meta={'progress': progress, 'sub_batch': i + 1, 'total_sub_batches': len(sub_batches)}
-                )
-                
-            except Exception as e:
-                logger.error(f"❌ Erro no sub-lote {i + 1}: {e}")
-                results["errors"].append({"sub_batch": i + 1, "error": str(e)})
+        total_sub_batches = _count_chunks(len(process_numbers), batch_size)
         
-        duration = time.time() - start_time
-        record_request_metrics("POST", "large_batch", 200, duration)
+        logger.info(f"📦 Processando {total_sub_batches} sub-lotes de até {batch_size} processos")
         
-        logger.info(f"✅ Processamento de lote grande concluído: {results['processed']} processados em {duration:.2f}s")
+        # Agendar sub-lotes como chord: o coordenador não bloqueia um slot do worker
+        # aguardando cada sub-lote (.get() dentro de task); a consolidação roda no callback.
+        # No máximo MAX_IN_FLIGHT_SUB_BATCHES sub-lotes por onda: o callback de cada onda
+        # agenda a seguinte, limitando a profundidade da fila e os resultados em memória
+        job = _large_batch_wave(process_numbers, batch_size, total_requested, self.request.id, time.time())
+        chord_result = job.apply_async()
         
-        return results
+        return {
+            "total_requested": total_requested,
+            "duplicates_removed": total_requested - len(process_numbers),
+            "sub_batches": total_sub_batches,
+            "consolidation_task_id": chord_result.id,
+            "batch_id": self.request.id
+        }
         
     except Exception as e:
-        duration = time.time() - start_time
         record_error_metrics("large_batch_failure", self.request.id, str(e))
         logger.error(f"❌ Erro no processamento de lote grande: {e}")
         raise self.retry(exc=e, countdown=300, max_retries=2)
 
 
+@celery_app.task(bind=True, name='consolidate_results')
+def consolidate_results(
+    self,
+    sub_results: List[Dict[str, Any]],
+    total_requested: int,
+    batch_id: str,
+    start_time: float,
+    remaining: Optional[List[str]] = None,
+    batch_size: int = 1000,
+    partial: Optional[Dict[str, Any]] = None,
+    next_sub_batch: int = 1
+):
+    """Consolidar os resultados de uma onda de sub-lotes de process_large_batch.
+    
+    Se ainda houver processos pendentes, a task é substituída pelo chord da próxima
+    onda (levando o parcial acumulado), de modo que o resultado final fica no mesmo id.
+    Sub-lotes que falharam chegam aqui como resultados com ``{"sub_batch": n, "error": ...}``
+    em ``errors``, então uma falha não interrompe as ondas seguintes.
+    """
+    results = partial or {
+        "total_requested": total_requested,
+        "processed": 0,
+        "errors": [],
+        "batch_id": batch_id
+    }
+    
+    for sub_result in sub_results:
+        results["processed"] += sub_result.get("found", 0)
+        results["errors"].extend(sub_result.get("errors", []))
+    
+    if remaining:
+        return self.replace(_large_batch_wave(
+            remaining, batch_size, total_requested, batch_id, start_time,
+            partial=results, first_sub_batch=next_sub_batch
+        ))
+    
+    duration = time.time() - start_time
+    record_request_metrics("POST", "large_batch", 200, duration)
+    
+    logger.info(f"✅ Processamento de lote grande concluído: {results['processed']} processados em {duration:.2f}s")
+    
+    return results
+
+
 @celery_app.task(bind=True, base=OptimizedCeleryTask, name='cleanup_old_tasks')
-async def cleanup_old_tasks(self, days: int = 7):
+def cleanup_old_tasks(self, days: int = 7):
     """Limpeza de tarefas antigas."""
     logger.info(f"🧹 Iniciando limpeza de tarefas antigas (>{days} dias)")
     
@@ -340,7 +607,7 @@ async def cleanup_old_tasks(self, days: int = 7):
 
 
 @celery_app.task(bind=True, base=OptimizedCeleryTask, name='health_check')
-async def health_check(self):
+def health_check(self):
     """Verificação de saúde do sistema."""
     logger.info("🏥 Executando verificação de saúde")
     
@@ -364,21 +631,3 @@ async def health_check(self):
         logger.error(f"❌ Erro na verificação de saúde: {e}")
         raise
 
-
-# Configurações de filas
-celery_app.conf.task_routes.update({
-    'app.tasks.optimized_celery_tasks.process_batch_search_optimized': {'queue': 'batch_search'},
-    'app.tasks.optimized_celery_tasks.download_documents_batch': {'queue': 'downloads'},
-    'app.tasks.optimized_celery_tasks.process_large_batch': {'queue': 'large_batch'},
-    'app.tasks.optimized_celery_tasks.cleanup_old_tasks': {'queue': 'maintenance'},
-    'app.tasks.optimized_celery_tasks.health_check': {'queue': 'monitoring'},
-})
-
-# Configurações de prioridade
-celery_app.conf.task_routes.update({
-    'app.tasks.optimized_celery_tasks.process_batch_search_optimized': {'priority': 5},
-    'app.tasks.optimized_celery_tasks.download_documents_batch': {'priority': 3},
-    'app.tasks.optimized_celery_tasks.process_large_batch': {'priority': 1},
-    'app.tasks.optimized_celery_tasks.cleanup_old_tasks': {'priority': 9},
-    'app.tasks.optimized_celery_tasks.health_check': {'priority': 10},
-})
@@ -1,18 +1,158 @@
 """Tarefas Celery para processamento de processos judiciais."""
 
-from datetime import datetime
+import asyncio
+from datetime import datetime, timezone
 from typing import List, Dict, Any
 from celery import current_task
 from loguru import logger
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, insert
+from sqlalchemy import func, select, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
 
-from app.tasks.celery_app import celery_app
+from app.tasks.celery_app import celery_app, run_async
 from app.core.database import AsyncSessionLocal
+from app.core.dynamic_limits import get_current_limits
 from app.core.cache import cache_service, get_process_cache_key
-from app.services.pdpj_client import pdpj_client, PDPJClientError
+from app.services.pdpj_client import pdpj_client, PDPJClientError, TransientPDPJError
 from app.services.s3_service import s3_service
 from app.models import Process, Document
+from app.utils.process_utils import normalize_process_numbers
+
+
+async def _add_processes_individually(
+    db: AsyncSession,
+    processes: List[Process],
+    outcomes: Dict[str, Any]
+) -> List[Process]:
+    """Inserir processo a processo (um savepoint por linha).
+    
+    Usado quando o insert do chunk conflita com uma inserção concorrente: o processo
+    já gravado por outro worker passa a ser o resultado, os demais são inseridos.
+    """
+    inserted = []
+    for process in processes:
+        try:
+            async with db.begin_nested():
+                db.add(process)
+            inserted.append(process)
+        except IntegrityError:
+            existing = await db.execute(
+                select(Process).where(Process.process_number == process.process_number)
+            )
+            outcomes[process.process_number] = existing.scalar_one_or_none()
+    await db.commit()
+    return inserted
+
+
+async def _run_batch(process_numbers: List[str], results: Dict[str, Any]) -> List[Process]:
+    """Buscar processos em chunks: uma consulta IN por chunk e chamadas PDPJ concorrentes."""
+    
+    limits = get_current_limits()
+    chunk_size = min(limits.max_batch_size, 100)
+    semaphore = asyncio.Semaphore(limits.max_concurrent_requests)
+    total = len(process_numbers)
+    found_processes = []
+    
+    # Um único timestamp para o lote (UTC sem tzinfo, como as colunas DateTime dos modelos)
+    consulted_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    
+    async def fetch_process(process_number: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await pdpj_client.get_process_full(process_number)
+    
+    for start in range(0, total, chunk_size):
+        chunk = process_numbers[start:start + chunk_size]
+        
+        # Atualizar progresso (uma vez por chunk)
+        current_task.update_state(
+            state="PROGRESS",
+            meta={
+                "current": start,
+                "total": total,
+                "progress": (start / total) * 100,
+                "status": f"Processando {len(chunk)} processos"
+            }
+        )
+        
+        new_processes = []
+        try:
+            async with AsyncSessionLocal() as db:
+                # Pré-carregar processos já existentes no banco com uma única consulta
+                existing_result = await db.execute(
+                    select(Process).where(Process.process_number.in_(chunk))
+                )
+                outcomes = {p.process_number: p for p in existing_result.scalars()}
+                
+                # Buscar na API PDPJ apenas os que faltam, concorrentemente
+                missing = [n for n in chunk if n not in outcomes]
+                fetched = await asyncio.gather(
+                    *[fetch_process(n) for n in missing],
+                    return_exceptions=True
+                )
+                
+                for process_number, pdpj_data in zip(missing, fetched):
+                    if isinstance(pdpj_data, PDPJClientError):
+                        logger.warning(f"Processo {process_number} não encontrado na API PDPJ: {pdpj_data}")
+                        outcomes[process_number] = None
+                    elif isinstance(pdpj_data, Exception):
+                        outcomes[process_number] = pdpj_data
+                    else:
+                        process = Process(
+                            process_number=process_number,
+                            full_data=pdpj_data,
+                            court=pdpj_data.get("tribunal"),
+                            subject=pdpj_data.get("assunto"),
+                            status=pdpj_data.get("situacao"),
+                            has_documents=bool(pdpj_data.get("documentos")),
+                            last_consultation=consulted_at
+                        )
+                        new_processes.append(process)
+                        outcomes[process_number] = process
+                
+                # Inserir todos os novos processos do chunk com um único commit
+                if new_processes:
+                    try:
+                        db.add_all(new_processes)
+                        await db.commit()
+                    except IntegrityError:
+                        # Outro worker inseriu algum destes processos no meio tempo
+                        logger.warning("Conflito ao inserir chunk; inserindo processo a processo")
+                        await db.rollback()
+                        new_processes = await _add_processes_individually(db, new_processes, outcomes)
+                    logger.info(f"{len(new_processes)} processos criados com sucesso")
+        
+        except Exception as e:
+            logger.error(f"Erro ao processar chunk de {len(chunk)} processos: {str(e)}")
+            outcomes = {n: e for n in chunk}
+            new_processes = []
+        
+        # Armazenar no cache (fora da transação: falha de cache não invalida o que foi gravado)
+        cached = await asyncio.gather(*[
+            cache_service.set(get_process_cache_key(p.process_number, "full"), p.full_data)
+            for p in new_processes
+        ], return_exceptions=True)
+        for process, outcome in zip(new_processes, cached):
+            if isinstance(outcome, Exception):
+                logger.warning(f"Falha ao armazenar {process.process_number} no cache: {outcome}")
+        
+        for process_number in chunk:
+            outcome = outcomes.get(process_number)
+            if isinstance(outcome, Exception):
+                logger.error(f"Erro ao processar {process_number}: {str(outcome)}")
+                results["errors"].append({
+                    "process_number": process_number,
+                    "error": str(outcome)
+                })
+                continue
+            
+            if outcome is not None:
+                found_processes.append(outcome)
+            else:
+                results["not_found"].append(process_number)
+            results["processed"] += 1
+    
+    return found_processes
 
 
 @celery_app.task(bind=True)
@@ -30,6 +170,7 @@ def process_batch_search(
         results = {
             "task_id": task_id,
             "total_requested": len(process_numbers),
+            "duplicates_removed": 0,
             "processed": 0,
             "found": 0,
             "not_found": [],
@@ -37,89 +178,27 @@ def process_batch_search(
             "processes": []
         }
         
-        # Processar cada processo
-        for i, process_number in enumerate(process_numbers):
-            try:
-                # Atualizar progresso
-                progress = (i / len(process_numbers)) * 100
-                current_task.update_state(
-                    state="PROGRESS",
-                    meta={
-                        "current": i,
-                        "total": len(process_numbers),
-                        "progress": progress,
-                        "status": f"Processando {process_number}"
-                    }
-                )
-                
-                # Verificar se já existe no banco
-                async def process_single():
-                    async with AsyncSessionLocal() as db:
-                        result = await db.execute(
-                            select(Process).where(Process.process_number == process_number)
-                        )
-                        existing_process = result.scalar_one_or_none()
-                        
-                        if existing_process:
-                            logger.info(f"Processo {process_number} já existe no banco")
-                            return existing_process
-                        
-                        # Buscar na API PDPJ
-                        try:
-                            pdpj_data = await pdpj_client.get_process_full(process_number)
-                            
-                            # Criar novo processo
-                            process = Process(
-                                process_number=process_number,
-                                full_data=pdpj_data,
-                                court=pdpj_data.get("tribunal"),
-                                subject=pdpj_data.get("assunto"),
-                                status=pdpj_data.get("situacao"),
-                                has_documents=bool(pdpj_data.get("documentos")),
-                                last_consultation=datetime.utcnow()
-                            )
-                            
-                            db.add(process)
-                            await db.commit()
-                            await db.refresh(process)
-                            
-                            # Armazenar no cache
-                            cache_key = get_process_cache_key(process_number, "full")
-                            await cache_service.set(cache_key, pdpj_data)
-                            
-                            logger.info(f"Processo {process_number} criado com sucesso")
-                            return process
-                            
-                        except PDPJClientError as e:
-                            logger.warning(f"Processo {process_number} não encontrado na API PDPJ: {e}")
-                            return None
-                
-                # Executar processamento assíncrono
-                import asyncio
-                process = asyncio.run(process_single())
-                
-                if process:
-                    results["found"] += 1
-                    results["processes"].append({
-                        "process_number": process.process_number,
-                        "court": process.court,
-                        "status": process.status
-                    })
-                    
-                    # Se incluir documentos, agendar download
-                    if include_documents and process.has_documents:
-                        download_process_documents.delay(process_number)
-                else:
-                    results["not_found"].append(process_number)
-                
-                results["processed"] += 1
-                
-            except Exception as e:
-                logger.error(f"Erro ao processar {process_number}: {str(e)}")
-                results["errors"].append({
-                    "process_number": process_number,
-                    "error": str(e)
-                })
+        # Normalizar (formatado ou não, o processo é o mesmo) e remover números repetidos
+        # (preservando a ordem): cada processo é buscado uma vez
+        unique_numbers = list(dict.fromkeys(normalize_process_numbers(process_numbers)))
+        if len(unique_numbers) != len(process_numbers):
+            results["duplicates_removed"] = len(process_numbers) - len(unique_numbers)
+            logger.info(f"{results['duplicates_removed']} números de processo duplicados removidos do lote {task_id}")
+        
+        # Executar o lote inteiro no event loop persistente do worker
+        found_processes = run_async(_run_batch(unique_numbers, results))
+        
+        for process in found_processes:
+            results["found"] += 1
+            results["processes"].append({
+                "process_number": process.process_number,
+                "court": process.court,
+                "status": process.status
+            })
+            
+            # Se incluir documentos, agendar download
+            if include_documents and process.has_documents:
+                download_process_documents.delay(process.process_number)
         
         logger.info(f"Processamento em lote {task_id} concluído")
         return results
@@ -159,7 +238,16 @@ def refresh_process_data(self, process_number: str) -> Dict[str, Any]:
         raise
 
 
-@celery_app.task(bind=True)
+@celery_app.task(
+    bind=True,
+    acks_late=True,
+    reject_on_worker_lost=True,
+    autoretry_for=(TransientPDPJError,),
+    retry_backoff=2,
+    retry_backoff_max=600,
+    retry_jitter=True,
+    max_retries=5
+)
 def download_process_documents(self, process_number: str) -> Dict[str, Any]:
     """Baixar todos os documentos de um processo."""
     
@@ -176,6 +264,21 @@ def download_process_documents(self, process_number: str) -> Dict[str, Any]:
             "errors": []
         }
         
+        async def download_document_to_s3(doc_data: Dict[str, Any], document_id: str) -> Dict[str, Any]:
+            """Transmitir um documento da API PDPJ direto para o S3 (apenas I/O, sem sessão de banco)."""
+            content_type = doc_data.get("arquivo", {}).get("tipo")
+            return await s3_service.upload_stream(
+                pdpj_client.stream_document(
+                    doc_data["hrefBinario"],
+                    process_number=process_number,
+                    expected_content_type=content_type
+                ),
+                process_number=process_number,
+                document_id=document_id,
+                filename=doc_data.get("nome"),
+                content_type=content_type
+            )
+        
         async def download_documents():
             async with AsyncSessionLocal() as db:
                 # Buscar processo no banco
@@ -191,116 +294,154 @@ def download_process_documents(self, process_number: str) -> Dict[str, Any]:
                 # Obter lista de documentos da API PDPJ
                 try:
                     documents_data = await pdpj_client.get_process_documents(process_number)
-                    result["documents_found"] = len(documents_data)
+                    total = len(documents_data)
+                    result["documents_found"] = total
                     
-                    for i, doc_data in enumerate(documents_data):
-                        try:
-                            # Atualizar progresso
-                            progress = (i / len(documents_data)) * 100
-                            current_task.update_state(
-                                state="PROGRESS",
-                                meta={
-                                    "current": i,
-                                    "total": len(documents_data),
-                                    "progress": progress,
-                                    "status": f"Baixando documento {doc_data.get('id', 'unknown')}"
-                                }
-                            )
-                            
-                            document_id = doc_data.get("id")
-                            if not document_id:
-                                continue
-                            
-                            # Verificar se documento já foi baixado
-                            doc_result = await db.execute(
-                                select(Document).where(
-                                    Document.document_id == document_id,
-                                    Document.process_id == process.id
-                                )
-                            )
-                            existing_doc = doc_result.scalar_one_or_none()
-                            
-                            if existing_doc and existing_doc.downloaded:
-                                logger.info(f"Documento {document_id} já foi baixado")
-                                result["documents_downloaded"] += 1
-                                continue
-                            
-                            # Baixar documento da API PDPJ
-                            try:
-                                file_content = await pdpj_client.download_document(
-                                    process_number, 
-                                    document_id,
-                                    doc_data.get("url")
-                                )
-                                
-                                # Upload para S3
-                                s3_result = await s3_service.upload_document(
-                                    file_content=file_content,
-                                    process_number=process_number,
-                                    document_id=document_id,
-                                    filename=doc_data.get("nome"),
-                                    content_type=doc_data.get("tipo_mime")
-                                )
-                                
-                                # Salvar metadados no banco
-                                if existing_doc:
-                                    existing_doc.downloaded = True
-                                    existing_doc.s3_key = s3_result["s3_key"]
-                                    existing_doc.s3_bucket = s3_result["bucket"]
-                                    existing_doc.size = s3_result["file_size"]
-                                    existing_doc.mime_type = s3_result["content_type"]
-                                else:
-                                    document = Document(
-                                        document_id=document_id,
-                                        process_id=process.id,
-                                        name=doc_data.get("nome"),
-                                        type=doc_data.get("tipo"),
-                                        size=s3_result["file_size"],
-                                        mime_type=s3_result["content_type"],
-                                        s3_key=s3_result["s3_key"],
-                                        s3_bucket=s3_result["bucket"],
-                                        raw_data=doc_data,
-                                        downloaded=True,
-                                        available=True
-                                    )
-                                    db.add(document)
-                                
-                                result["documents_downloaded"] += 1
-                                logger.info(f"Documento {document_id} baixado com sucesso")
-                                
-                            except Exception as e:
-                                logger.error(f"Erro ao baixar documento {document_id}: {str(e)}")
-                                result["documents_failed"] += 1
-                                result["errors"].append({
-                                    "document_id": document_id,
-                                    "error": str(e)
-                                })
+                    # Carregar documentos já registrados com uma única consulta IN (document_id é
+                    # único globalmente: um documento já gravado sob outro processo também conta)
+                    document_ids = [d["idOrigem"] for d in documents_data if d.get("idOrigem")]
+                    existing_docs = {}
+                    if document_ids:
+                        docs_result = await db.execute(
+                            select(Document).where(Document.document_id.in_(document_ids))
+                        )
+                        existing_docs = {d.document_id: d for d in docs_result.scalars()}
+                    
+                    # Selecionar documentos pendentes (a sessão não é compartilhada entre corrotinas)
+                    pending = []
+                    for doc_data in documents_data:
+                        document_id = doc_data.get("idOrigem")
+                        if not document_id:
+                            continue
+                        
+                        if not doc_data.get("hrefBinario"):
+                            result["documents_failed"] += 1
+                            result["errors"].append({
+                                "document_id": document_id,
+                                "error": "hrefBinario não encontrado"
+                            })
+                            continue
+                        
+                        # Verificar se documento já foi baixado
+                        existing_doc = existing_docs.get(document_id)
                         
-                        except Exception as e:
-                            logger.error(f"Erro ao processar documento {i}: {str(e)}")
+                        if existing_doc and existing_doc.downloaded:
+                            logger.debug(f"Documento {document_id} já foi baixado")
+                            result["documents_downloaded"] += 1
+                            continue
+                        
+                        pending.append((document_id, doc_data))
+                    
+                    current_task.update_state(
+                        state="PROGRESS",
+                        meta={
+                            "current": total - len(pending),
+                            "total": total,
+                            "progress": ((total - len(pending)) / total) * 100 if total else 100,
+                            "status": f"Baixando {len(pending)} documentos"
+                        }
+                    )
+                    
+                    # Baixar e enviar ao S3 todos os documentos de uma vez: a concorrência de cada
+                    # etapa é limitada pelo semáforo do próprio serviço (downloads PDPJ em
+                    # pdpj_client, operações S3 em s3_service), não por um tamanho de lote fixo
+                    s3_results = await asyncio.gather(
+                        *[download_document_to_s3(doc_data, document_id) for document_id, doc_data in pending],
+                        return_exceptions=True
+                    )
+                    
+                    # Salvar metadados no banco: um único INSERT ... ON CONFLICT (upsert) e um único commit
+                    # (bucket é o mesmo para todo o processo: resolvido uma vez fora do loop)
+                    s3_bucket = s3_service.bucket_name
+                    saved_docs = []
+                    transient_error = None
+                    for (document_id, doc_data), s3_result in zip(pending, s3_results):
+                        if isinstance(s3_result, Exception):
+                            if isinstance(s3_result, TransientPDPJError):
+                                transient_error = s3_result
+                            err_msg = str(s3_result)[:500]
+                            logger.debug(f"Erro ao baixar documento {document_id}: {err_msg}")
                             result["documents_failed"] += 1
                             result["errors"].append({
-                                "document_index": i,
-                                "error": str(e)
+                                "document_id": document_id,
+                                "error": err_msg
                             })
+                            continue
+                        
+                        saved_docs.append({
+                            "document_id": document_id,
+                            "process_id": process.id,
+                            "name": doc_data.get("nome"),
+                            "type": doc_data.get("tipo", {}).get("nome"),
+                            "size": s3_result["file_size"],
+                            "mime_type": s3_result["content_type"],
+                            "s3_key": s3_result["s3_key"],
+                            "s3_bucket": s3_bucket,
+                            "raw_data": doc_data,
+                            "downloaded": True,
+                            "available": True
+                        })
+                        
+                        result["documents_downloaded"] += 1
+                        logger.debug(f"Documento {document_id} baixado com sucesso")
+                    
+                    if saved_docs:
+                        # executemany do Core (insertmanyvalues): o driver agrupa as linhas em
+                        # lotes, sem montar um único VALUES com N×colunas parâmetros
+                        stmt = pg_insert(Document)
+                        stmt = stmt.on_conflict_do_update(
+                            index_elements=[Document.document_id],
+                            set_={
+                                "downloaded": stmt.excluded.downloaded,
+                                "s3_key": stmt.excluded.s3_key,
+                                "s3_bucket": stmt.excluded.s3_bucket,
+                                "size": stmt.excluded.size,
+                                "mime_type": stmt.excluded.mime_type,
+                                "updated_at": func.now()
+                            }
+                        )
+                        await db.execute(stmt, saved_docs)
+                        await db.commit()
+                    
+                    # Um único evento estruturado (detalhes por documento ficam em DEBUG)
+                    logger.bind(
+                        task_id=task_id,
+                        process_number=process_number,
+                        n_ok=len(saved_docs),
+                        n_skipped=total - len(pending),
+                        n_fail=result["documents_failed"]
+                    ).info("📦 Documentos do processo processados")
+                    
+                    # Erro transitório da PDPJ: o que foi baixado já está salvo, deixar o Celery
+                    # reagendar a task com backoff (documentos já baixados são ignorados na nova tentativa)
+                    if transient_error is not None:
+                        raise transient_error
                     
                     # Atualizar flag de documentos baixados no processo
                     process.documents_downloaded = True
                     await db.commit()
                     
+                except TransientPDPJError:
+                    raise
                 except PDPJClientError as e:
                     logger.error(f"Erro ao obter lista de documentos: {e}")
                     result["errors"].append({
                         "error": f"Erro ao obter lista de documentos: {str(e)}"
                     })
         
-        # Executar download assíncrono
-        import asyncio
-        asyncio.run(download_documents())
+        # Executar download assíncrono no event loop persistente do worker
+        run_async(download_documents())
         
-        logger.info(f"Download de documentos do processo {process_number} concluído")
+        logger.bind(
+            task_id=task_id,
+            process_number=process_number,
+            documents_found=result["documents_found"],
+            documents_downloaded=result["documents_downloaded"],
+            documents_failed=result["documents_failed"]
+        ).info(f"Download de documentos do processo {process_number} concluído")
         return result
         
-    except Exception as e:
-        logger.error(f"Erro ao baixar documentos do processo {process_number}: {str(e)}")
+    except Exception:
+        # Traceback anexado ao registro: só é formatado se algum sink aceitar o nível
+        logger.opt(exception=True).error(f"Erro ao baixar documentos do processo {process_number}")
         raise
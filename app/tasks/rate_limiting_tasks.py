@@ -1,12 +1,140 @@
 """Tasks periódicas para limpeza e manutenção do rate limiting."""
 
+import threading
 import time
-from typing import Optional
+from collections import defaultdict, deque
+from typing import Any, Dict, Optional
 from celery import Celery
+from celery.signals import worker_shutdown
 from loguru import logger
 
 from app.core.config import settings
 
+_NS_PER_MS = 1_000_000
+
+# Chaves por iteração do SCAN: equilibra round-trips e trabalho por chamada no Redis
+_SCAN_COUNT = 500
+# Chaves por pipeline (um round-trip por lote em vez de um por comando)
+_PIPELINE_BATCH = 200
+
+# Limpeza atômica de uma chave: remove entradas antigas e apaga a chave se ficar vazia
+_CLEANUP_LUA = """
+local removed = redis.call('ZREMRANGEBYSCORE', KEYS[1], 0, ARGV[1])
+if redis.call('ZCARD', KEYS[1]) == 0 then
+    redis.call('DEL', KEYS[1])
+end
+return removed
+"""
+
+
+# Janela de amostras de latência (ns) por operação Redis, para calibrar _SCAN_COUNT/_PIPELINE_BATCH
+_LATENCY_WINDOW = 1024
+_LATENCY_SAMPLES: Dict[str, deque] = defaultdict(lambda: deque(maxlen=_LATENCY_WINDOW))
+
+
+class _Timer:
+    """Context manager que registra a latência de uma operação Redis."""
+    
+    __slots__ = ("op", "_start")
+    
+    def __init__(self, op: str):
+        self.op = op
+    
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        return self
+    
+    def __exit__(self, *exc_info) -> bool:
+        _LATENCY_SAMPLES[self.op].append(time.perf_counter_ns() - self._start)
+        return False
+
+
+def _latency_summary(op: str) -> Dict[str, Any]:
+    """Resumir p50/p95 (ms) das últimas amostras de uma operação."""
+    samples = sorted(_LATENCY_SAMPLES[op])
+    if not samples:
+        return {"op": op, "samples": 0}
+    
+    count = len(samples)
+    return {
+        "op": op,
+        "p50_ms": round(samples[count // 2] / _NS_PER_MS, 3),
+        "p95_ms": round(samples[min(int(count * 0.95), count - 1)] / _NS_PER_MS, 3),
+        "samples": count
+    }
+
+
+# Pools de conexão Redis por URL, compartilhados entre execuções das tasks do worker
+_POOLS: Dict[str, Any] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def _get_client(redis_url: str):
+    """Obter cliente Redis sobre um pool persistente (sem handshake TCP/AUTH por task)."""
+    import redis
+    
+    pool = _POOLS.get(redis_url)
+    if pool is None:
+        with _POOLS_LOCK:
+            pool = _POOLS.get(redis_url)
+            if pool is None:
+                pool = redis.BlockingConnectionPool.from_url(redis_url, max_connections=16, timeout=5)
+                _POOLS[redis_url] = pool
+    return redis.Redis(connection_pool=pool)
+
+
+@worker_shutdown.connect
+def _disconnect_redis_pools(**kwargs) -> None:
+    """Fechar as conexões dos pools Redis no encerramento do worker."""
+    with _POOLS_LOCK:
+        for pool in _POOLS.values():
+            pool.disconnect()
+        _POOLS.clear()
+
+
+def _scan_batches(redis_client, pattern: str, batch_size: int = _PIPELINE_BATCH):
+    """Percorrer as chaves com SCAN, agrupando-as em lotes de até ``batch_size``."""
+    batch = []
+    for key in redis_client.scan_iter(match=pattern, count=_SCAN_COUNT):
+        batch.append(key)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _cleanup_keys(redis_client, pattern: str, cutoff_time: float) -> tuple:
+    """Remover entradas antigas das chaves e apagar as que ficarem vazias.
+    
+    Cada chave é limpa por um script Lua atômico (sem corrida entre ZCARD e DEL),
+    enviado via EVALSHA em pipelines por lote de chaves.
+    
+    Returns:
+        Tupla (keys_processed, total_removed)
+    """
+    total_removed = 0
+    keys_processed = 0
+    
+    # register_script: EVALSHA com carga automática do script (NOSCRIPT) pelo pipeline
+    cleanup_script = redis_client.register_script(_CLEANUP_LUA)
+    
+    for keys in _scan_batches(redis_client, pattern):
+        pipe = redis_client.pipeline(transaction=False)
+        for key in keys:
+            cleanup_script(keys=[key], args=[cutoff_time], client=pipe)
+        with _Timer("cleanup"):
+            results = pipe.execute(raise_on_error=False)
+        
+        for key, removed in zip(keys, results):
+            if isinstance(removed, Exception):
+                logger.error(f"Erro ao limpar chave {key}: {str(removed)}")
+                continue
+            total_removed += removed
+            keys_processed += 1
+    
+    return keys_processed, total_removed
+
 
 def create_rate_limiting_celery_app() -> Optional[Celery]:
     """Criar app Celery para tasks de rate limiting se configurado."""
@@ -29,6 +157,13 @@ def create_rate_limiting_celery_app() -> Optional[Celery]:
         task_track_started=True,
         task_time_limit=300,  # 5 minutos
         task_soft_time_limit=240,  # 4 minutos
+        # Tasks de manutenção curtas e idempotentes: ack antecipado e prefetch maior
+        worker_prefetch_multiplier=4,
+        task_acks_late=False,
+        task_reject_on_worker_lost=False,
+        broker_connection_retry_on_startup=True,
+        result_expires=3600,  # 1 hora
+        broker_transport_options={'visibility_timeout': 600, 'socket_keepalive': True},
     )
     
     return celery_app
@@ -50,36 +185,16 @@ def cleanup_redis_rate_limiting_task(self, redis_url: str, key_prefix: str = "ra
         Dict com estatísticas da limpeza
     """
     try:
-        import redis
-        
-        # Conectar ao Redis
-        redis_client = redis.Redis.from_url(redis_url, decode_responses=False)
+        # Conectar ao Redis (pool persistente)
+        redis_client = _get_client(redis_url)
         
         # Calcular cutoff time (2 horas atrás)
         current_time = time.time()
         cutoff_time = current_time - (2 * 3600)  # 2 horas
         
-        # Obter todas as chaves do rate limiting
+        # Percorrer as chaves do rate limiting com SCAN (KEYS bloqueia o Redis)
         pattern = f"{key_prefix}:*"
-        keys = redis_client.keys(pattern)
-        
-        total_removed = 0
-        keys_processed = 0
-        
-        for key in keys:
-            try:
-                # Remover entradas antigas de cada chave
-                removed = redis_client.zremrangebyscore(key, 0, cutoff_time)
-                total_removed += removed
-                keys_processed += 1
-                
-                # Se a chave ficou vazia, removê-la
-                if redis_client.zcard(key) == 0:
-                    redis_client.delete(key)
-                
-            except Exception as e:
-                logger.error(f"Erro ao limpar chave {key}: {str(e)}")
-                continue
+        keys_processed, total_removed = _cleanup_keys(redis_client, pattern, cutoff_time)
         
         # Estatísticas
         stats = {
@@ -90,6 +205,7 @@ def cleanup_redis_rate_limiting_task(self, redis_url: str, key_prefix: str = "ra
         }
         
         logger.info(f"Limpeza Redis concluída: {stats}")
+        logger.info(f"Latência Redis: {_latency_summary('cleanup')}")
         return stats
         
     except Exception as e:
@@ -109,35 +225,39 @@ def get_rate_limiting_stats_task(self, redis_url: str, key_prefix: str = "rate_l
         Dict com estatísticas
     """
     try:
-        import redis
-        
-        # Conectar ao Redis
-        redis_client = redis.Redis.from_url(redis_url, decode_responses=False)
+        # Conectar ao Redis (pool persistente)
+        redis_client = _get_client(redis_url)
         
-        # Obter todas as chaves
+        # Percorrer as chaves com SCAN (KEYS bloqueia o Redis)
         pattern = f"{key_prefix}:*"
-        keys = redis_client.keys(pattern)
         
-        total_clients = len(keys)
+        total_clients = 0
         total_requests = 0
         active_clients = 0
         
         current_time = time.time()
         window_start = current_time - 3600  # Última hora
         
-        for key in keys:
-            try:
-                # Contar total de requisições
-                total_requests += redis_client.zcard(key)
+        for keys in _scan_batches(redis_client, pattern, batch_size=_SCAN_COUNT):
+            total_clients += len(keys)
+            
+            # ZCARD (total) + ZCOUNT (última hora) de todo o lote em um único round-trip
+            pipe = redis_client.pipeline(transaction=False)
+            for key in keys:
+                pipe.zcard(key)
+                pipe.zcount(key, window_start, "+inf")
+            with _Timer("stats"):
+                results = pipe.execute(raise_on_error=False)
+            
+            for key, card, recent_requests in zip(keys, results[0::2], results[1::2]):
+                error = next((r for r in (card, recent_requests) if isinstance(r, Exception)), None)
+                if error is not None:
+                    logger.error(f"Erro ao processar chave {key}: {str(error)}")
+                    continue
                 
-                # Verificar se tem requisições na última hora
-                recent_requests = redis_client.zcount(key, window_start, "+inf")
+                total_requests += card
                 if recent_requests > 0:
                     active_clients += 1
-                    
-            except Exception as e:
-                logger.error(f"Erro ao processar chave {key}: {str(e)}")
-                continue
         
         stats = {
             "total_clients": total_clients,
@@ -147,6 +267,7 @@ def get_rate_limiting_stats_task(self, redis_url: str, key_prefix: str = "rate_l
         }
         
         logger.info(f"Estatísticas Redis: {stats}")
+        logger.info(f"Latência Redis: {_latency_summary('stats')}")
         return stats
         
     except Exception as e:
@@ -165,29 +286,33 @@ def health_check_redis_task(self, redis_url: str):
         Dict com status da saúde
     """
     try:
-        import redis
-        
-        # Conectar ao Redis
-        redis_client = redis.Redis.from_url(redis_url)
+        # Conectar ao Redis (pool persistente)
+        redis_client = _get_client(redis_url)
         
         # Teste básico de conectividade
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
         redis_client.ping()
-        response_time = time.time() - start_time
+        response_time_ns = time.perf_counter_ns() - start_ns
         
-        # Obter informações do Redis
-        info = redis_client.info()
+        # Apenas as seções de INFO necessárias, em um único round-trip
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.info('server')
+        pipe.info('memory')
+        pipe.info('clients')
+        with _Timer("health_info"):
+            server_info, memory_info, clients_info = pipe.execute()
         
         health_status = {
             "status": "healthy",
-            "response_time_ms": round(response_time * 1000, 2),
-            "redis_version": info.get("redis_version"),
-            "used_memory_human": info.get("used_memory_human"),
-            "connected_clients": info.get("connected_clients"),
+            "response_time_ms": round(response_time_ns / _NS_PER_MS, 2),
+            "redis_version": server_info.get("redis_version"),
+            "used_memory_human": memory_info.get("used_memory_human"),
+            "connected_clients": clients_info.get("connected_clients"),
             "timestamp": time.time()
         }
         
         logger.info(f"Health check Redis: {health_status}")
+        logger.debug(f"Latência Redis: {_latency_summary('health_info')}")
         return health_status
         
     except Exception as e:
@@ -207,26 +332,21 @@ def schedule_periodic_tasks():
         return
     
     try:
-        # Limpeza a cada 30 minutos
+        # Todas as entradas em uma única atualização do beat_schedule
         celery_app.conf.beat_schedule.update({
+            # Limpeza a cada 30 minutos
             'cleanup-redis-rate-limiting': {
                 'task': 'cleanup_redis_rate_limiting',
                 'schedule': 30 * 60,  # 30 minutos
                 'args': (settings.redis_url, "rate_limit")
             },
-        })
-        
-        # Estatísticas a cada 5 minutos
-        celery_app.conf.beat_schedule.update({
+            # Estatísticas a cada 5 minutos
             'get-rate-limiting-stats': {
                 'task': 'get_rate_limiting_stats',
                 'schedule': 5 * 60,  # 5 minutos
                 'args': (settings.redis_url, "rate_limit")
             },
-        })
-        
-        # Health check a cada 2 minutos
-        celery_app.conf.beat_schedule.update({
+            # Health check a cada 2 minutos
             'health-check-redis': {
                 'task': 'health_check_redis',
                 'schedule': 2 * 60,  # 2 minutos
@@ -257,23 +377,7 @@ def manual_cleanup_redis(redis_client, key_prefix: str = "rate_limit") -> dict:
         cutoff_time = current_time - (2 * 3600)  # 2 horas
         
         pattern = f"{key_prefix}:*"
-        keys = redis_client.keys(pattern)
-        
-        total_removed = 0
-        keys_processed = 0
-        
-        for key in keys:
-            try:
-                removed = redis_client.zremrangebyscore(key, 0, cutoff_time)
-                total_removed += removed
-                keys_processed += 1
-                
-                if redis_client.zcard(key) == 0:
-                    redis_client.delete(key)
-                    
-            except Exception as e:
-                logger.error(f"Erro ao limpar chave {key}: {str(e)}")
-                continue
+        keys_processed, total_removed = _cleanup_keys(redis_client, pattern, cutoff_time)
         
         stats = {
             "keys_processed": keys_processed,
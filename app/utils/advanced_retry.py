@@ -5,30 +5,51 @@ Sistema avançado de retry com backoff exponencial e jitter.
 import asyncio
 import random
 import time
+from email.utils import parsedate_to_datetime
 from typing import Callable, Any, Optional, Dict, List, Type, Union
 from functools import wraps
-from enum import Enum
+from enum import IntEnum
 from dataclasses import dataclass
 from loguru import logger
 
-from app.core.dynamic_limits import get_current_limits
+from app.core.dynamic_limits import DynamicLimits, get_current_limits
 
 
-class RetryStrategy(str, Enum):
-    """Estratégias de retry."""
-    EXPONENTIAL = "exponential"
-    LINEAR = "linear"
-    FIXED = "fixed"
-    CUSTOM = "custom"
+# Limites do ambiente lidos uma única vez por processo (ver refresh_limits)
+_LIMITS: Optional[DynamicLimits] = None
 
 
-class RetryCondition(str, Enum):
-    """Condições para retry."""
-    ALL_EXCEPTIONS = "all_exceptions"
-    SPECIFIC_EXCEPTIONS = "specific_exceptions"
-    HTTP_ERRORS = "http_errors"
-    TIMEOUT_ERRORS = "timeout_errors"
-    RATE_LIMIT_ERRORS = "rate_limit_errors"
+def _get_limits() -> DynamicLimits:
+    """Obter limites do ambiente em cache."""
+    global _LIMITS
+    if _LIMITS is None:
+        _LIMITS = get_current_limits()
+    return _LIMITS
+
+
+def refresh_limits() -> None:
+    """Recarregar limites do ambiente (ex.: após set_custom_limits)."""
+    global _LIMITS
+    _LIMITS = get_current_limits()
+
+
+class RetryStrategy(IntEnum):
+    """Estratégias de retry (use ``.name`` para logs/serialização)."""
+    EXPONENTIAL = 1
+    # Backoff exponencial com "full jitter": delay sorteado entre 0 e o teto exponencial
+    EXPONENTIAL_FULL_JITTER = 2
+    LINEAR = 3
+    FIXED = 4
+    CUSTOM = 5
+
+
+class RetryCondition(IntEnum):
+    """Condições para retry (use ``.name`` para logs/serialização)."""
+    ALL_EXCEPTIONS = 1
+    SPECIFIC_EXCEPTIONS = 2
+    HTTP_ERRORS = 3
+    TIMEOUT_ERRORS = 4
+    RATE_LIMIT_ERRORS = 5
 
 
 @dataclass
@@ -52,41 +73,53 @@ class AdvancedRetry:
     
     def __init__(self, config: RetryConfig = None):
         self.config = config or RetryConfig()
-        self.limits = get_current_limits()
+        self.limits = _get_limits()
         
         # Aplicar limites do ambiente
         self.config.max_attempts = min(self.config.max_attempts, self.limits.max_retries)
         self.config.max_delay = min(self.config.max_delay, self.limits.max_retry_delay)
         self.config.base_delay = min(self.config.base_delay, self.limits.retry_delay)
-    
-    def calculate_delay(self, attempt: int) -> float:
-        """Calcular delay para a tentativa atual."""
-        if attempt <= 0:
-            return 0.0
         
-        # Calcular delay base
-        if self.config.strategy == RetryStrategy.EXPONENTIAL:
+        # Estratégia resolvida uma vez para o caminho quente de calculate_delay
+        self._full_jitter = self.config.strategy == RetryStrategy.EXPONENTIAL_FULL_JITTER
+        
+        # Códigos HTTP e exceções retentáveis resolvidos uma vez (lookup O(1) no caminho de erro)
+        self._retry_codes = frozenset(self.config.http_status_codes or ())
+        self._specific = tuple(self.config.specific_exceptions or ())
+        
+        # Delays (já limitados por max_delay) pré-calculados para cada tentativa
+        self._delays = [self._base_delay(attempt) for attempt in range(1, self.config.max_attempts + 1)]
+    
+    def _base_delay(self, attempt: int) -> float:
+        """Delay da estratégia configurada, sem jitter, limitado por max_delay."""
+        if self.config.strategy in (RetryStrategy.EXPONENTIAL, RetryStrategy.EXPONENTIAL_FULL_JITTER):
             delay = self.config.base_delay * (self.config.backoff_multiplier ** (attempt - 1))
         elif self.config.strategy == RetryStrategy.LINEAR:
             delay = self.config.base_delay * attempt
-        elif self.config.strategy == RetryStrategy.FIXED:
-            delay = self.config.base_delay
         else:
             delay = self.config.base_delay
         
-        # Aplicar delay máximo
-        delay = min(delay, self.config.max_delay)
+        return min(delay, self.config.max_delay)
+    
+    def calculate_delay(self, attempt: int) -> float:
+        """Calcular delay para a tentativa atual."""
+        if attempt <= 0:
+            return 0.0
+        
+        # Delay pré-calculado (fora da tabela, calcular sob demanda)
+        delay = self._delays[attempt - 1] if attempt <= len(self._delays) else self._base_delay(attempt)
+        
+        # Full jitter: espalha as novas tentativas de vários clientes por todo o intervalo
+        if self._full_jitter:
+            return max(random.uniform(0, delay), 0.1)
         
         # Aplicar jitter se habilitado
         if self.config.jitter:
             jitter_amount = delay * self.config.jitter_range
-            jitter = random.uniform(-jitter_amount, jitter_amount)
-            delay += jitter
+            delay += random.uniform(-jitter_amount, jitter_amount)
         
         # Garantir delay mínimo
-        delay = max(delay, 0.1)
-        
-        return delay
+        return max(delay, 0.1)
     
     def should_retry(self, exception: Exception, attempt: int) -> bool:
         """Determinar se deve tentar novamente."""
@@ -97,16 +130,39 @@ class AdvancedRetry:
         if self.config.condition == RetryCondition.ALL_EXCEPTIONS:
             return True
         elif self.config.condition == RetryCondition.SPECIFIC_EXCEPTIONS:
-            return isinstance(exception, tuple(self.config.specific_exceptions or []))
+            return isinstance(exception, self._specific)
         elif self.config.condition == RetryCondition.HTTP_ERRORS:
-            return hasattr(exception, 'status_code') and exception.status_code in (self.config.http_status_codes or [])
+            code = getattr(exception, 'status_code', None)
+            return code is not None and code in self._retry_codes
         elif self.config.condition == RetryCondition.TIMEOUT_ERRORS:
             return isinstance(exception, (asyncio.TimeoutError, TimeoutError))
         elif self.config.condition == RetryCondition.RATE_LIMIT_ERRORS:
-            return hasattr(exception, 'status_code') and exception.status_code == 429
+            return getattr(exception, 'status_code', None) == 429
         
         return False
     
+    def retry_after_hint(self, exception: Exception) -> Optional[float]:
+        """Extrair o header Retry-After (segundos ou HTTP-date) da exceção, se houver."""
+        # httpx.HTTPStatusError expõe .response.headers; aiohttp.ClientResponseError expõe .headers
+        response = getattr(exception, 'response', None)
+        headers = getattr(response, 'headers', None) or getattr(exception, 'headers', None)
+        if not headers:
+            return None
+        
+        value = headers.get('Retry-After')
+        if not value:
+            return None
+        
+        try:
+            return max(float(int(value)), 0.0)
+        except (TypeError, ValueError):
+            pass
+        
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError, IndexError, OverflowError):
+            return None
+    
     async def execute_with_retry(self, func: Callable, *args, **kwargs) -> Any:
         """Executar função com retry."""
         last_exception = None
@@ -133,6 +189,12 @@ class AdvancedRetry:
                 # Calcular delay
                 delay = self.calculate_delay(attempt)
                 
+                # Em 429, respeitar o intervalo informado pelo servidor (limitado por max_delay)
+                if getattr(e, 'status_code', None) == 429 or getattr(e, 'status', None) == 429:
+                    hint = self.retry_after_hint(e)
+                    if hint is not None:
+                        delay = min(max(delay, hint), self.config.max_delay)
+                
                 logger.warning(f"⚠️ Tentativa {attempt} falhou: {e}")
                 logger.info(f"⏳ Aguardando {delay:.2f}s antes da próxima tentativa")
                 
@@ -146,9 +208,11 @@ class AdvancedRetry:
     def retry_decorator(self, config: RetryConfig = None):
         """Decorator para retry automático."""
         def decorator(func: Callable):
+            # Instância criada uma vez na decoração, não a cada chamada
+            retry_instance = AdvancedRetry(config or self.config)
+            
             @wraps(func)
             async def wrapper(*args, **kwargs):
-                retry_instance = AdvancedRetry(config or self.config)
                 return await retry_instance.execute_with_retry(func, *args, **kwargs)
             return wrapper
         return decorator
@@ -165,7 +229,7 @@ class RetryConfigs:
             max_attempts=5,
             base_delay=1.0,
             max_delay=30.0,
-            strategy=RetryStrategy.EXPONENTIAL,
+            strategy=RetryStrategy.EXPONENTIAL_FULL_JITTER,
             jitter=True,
             jitter_range=0.1,
             backoff_multiplier=2.0,
@@ -181,7 +245,7 @@ class RetryConfigs:
             max_attempts=7,
             base_delay=2.0,
             max_delay=120.0,
-            strategy=RetryStrategy.EXPONENTIAL,
+            strategy=RetryStrategy.EXPONENTIAL_FULL_JITTER,
             jitter=True,
             jitter_range=0.2,
             backoff_multiplier=2.5,
@@ -239,64 +303,61 @@ class RetryConfigs:
 # Instância global
 advanced_retry = AdvancedRetry()
 
+# Instâncias pré-configuradas reutilizadas pelas funções de conveniência
+_HTTP_RETRY = AdvancedRetry(RetryConfigs.http_requests())
+_RATE_RETRY = AdvancedRetry(RetryConfigs.rate_limit())
+_TIMEOUT_RETRY = AdvancedRetry(RetryConfigs.timeouts())
+_DB_RETRY = AdvancedRetry(RetryConfigs.database_operations())
+_FILE_RETRY = AdvancedRetry(RetryConfigs.file_operations())
+
 
-# Funções de conveniência
-async def retry_http_request(func: Callable, *args, **kwargs) -> Any:
+# Funções de conveniência (nomes distintos dos decorators abaixo para não serem sobrescritas)
+async def run_with_http_retry(func: Callable, *args, **kwargs) -> Any:
     """Executar requisição HTTP com retry."""
-    config = RetryConfigs.http_requests()
-    retry_instance = AdvancedRetry(config)
-    return await retry_instance.execute_with_retry(func, *args, **kwargs)
+    return await _HTTP_RETRY.execute_with_retry(func, *args, **kwargs)
 
 
-async def retry_rate_limit(func: Callable, *args, **kwargs) -> Any:
+async def run_with_rate_limit_retry(func: Callable, *args, **kwargs) -> Any:
     """Executar operação com retry para rate limiting."""
-    config = RetryConfigs.rate_limit()
-    retry_instance = AdvancedRetry(config)
-    return await retry_instance.execute_with_retry(func, *args, **kwargs)
+    return await _RATE_RETRY.execute_with_retry(func, *args, **kwargs)
 
 
-async def retry_timeout(func: Callable, *args, **kwargs) -> Any:
+async def run_with_timeout_retry(func: Callable, *args, **kwargs) -> Any:
     """Executar operação com retry para timeouts."""
-    config = RetryConfigs.timeouts()
-    retry_instance = AdvancedRetry(config)
-    return await retry_instance.execute_with_retry(func, *args, **kwargs)
+    return await _TIMEOUT_RETRY.execute_with_retry(func, *args, **kwargs)
 
 
-async def retry_database(func: Callable, *args, **kwargs) -> Any:
+async def run_with_database_retry(func: Callable, *args, **kwargs) -> Any:
     """Executar operação de banco com retry."""
-    config = RetryConfigs.database_operations()
-    retry_instance = AdvancedRetry(config)
-    return await retry_instance.execute_with_retry(func, *args, **kwargs)
+    return await _DB_RETRY.execute_with_retry(func, *args, **kwargs)
 
 
-async def retry_file_operation(func: Callable, *args, **kwargs) -> Any:
+async def run_with_file_retry(func: Callable, *args, **kwargs) -> Any:
     """Executar operação de arquivo com retry."""
-    config = RetryConfigs.file_operations()
-    retry_instance = AdvancedRetry(config)
-    return await retry_instance.execute_with_retry(func, *args, **kwargs)
+    return await _FILE_RETRY.execute_with_retry(func, *args, **kwargs)
 
 
 # Decorators de conveniência
 def retry_http(config: RetryConfig = None):
     """Decorator para requisições HTTP com retry."""
-    return advanced_retry.retry_decorator(config or RetryConfigs.http_requests())
+    return advanced_retry.retry_decorator(config or _HTTP_RETRY.config)
 
 
 def retry_rate_limit(config: RetryConfig = None):
     """Decorator para rate limiting com retry."""
-    return advanced_retry.retry_decorator(config or RetryConfigs.rate_limit())
+    return advanced_retry.retry_decorator(config or _RATE_RETRY.config)
 
 
 def retry_timeout(config: RetryConfig = None):
     """Decorator para timeouts com retry."""
-    return advanced_retry.retry_decorator(config or RetryConfigs.timeouts())
+    return advanced_retry.retry_decorator(config or _TIMEOUT_RETRY.config)
 
 
 def retry_database(config: RetryConfig = None):
     """Decorator para operações de banco com retry."""
-    return advanced_retry.retry_decorator(config or RetryConfigs.database_operations())
+    return advanced_retry.retry_decorator(config or _DB_RETRY.config)
 
 
 def retry_file_operation(config: RetryConfig = None):
     """Decorator para operações de arquivo com retry."""
-    return advanced_retry.retry_decorator(config or RetryConfigs.file_operations())
+    return advanced_retry.retry_decorator(config or _FILE_RETRY.config)
@@ -8,6 +8,25 @@ from typing import Optional, Dict, Any, Tuple
 from loguru import logger
 
 
+# Caracteres permitidos em nomes de arquivo além dos alfanuméricos
+_FILENAME_EXTRA_CHARS = ' -_.'
+
+# Tabela de str.translate que remove os caracteres não permitidos da faixa Latin-1
+# (cobre nomes em português); fora dela, cai no filtro caractere a caractere
+_FILENAME_DELETE_TABLE = str.maketrans('', '', ''.join(
+    chr(code) for code in range(256)
+    if not (chr(code).isalnum() or chr(code) in _FILENAME_EXTRA_CHARS)
+))
+
+
+def _group_signatures_by_length(signatures: Dict[bytes, str]) -> Tuple[Tuple[int, Dict[bytes, str]], ...]:
+    """Agrupar assinaturas por tamanho, para detecção por consulta em dicionário."""
+    grouped: Dict[int, Dict[bytes, str]] = {}
+    for signature, extension in signatures.items():
+        grouped.setdefault(len(signature), {})[signature] = extension
+    return tuple(sorted(grouped.items()))
+
+
 class FileValidator:
     """Validador de tipos de arquivo e conteúdo."""
     
@@ -38,6 +57,9 @@ class FileValidator:
         b'GIF89a': '.gif',  # GIF89a
     }
     
+    # Assinaturas agrupadas por tamanho: ((tamanho, {prefixo: extensão}), ...)
+    _SIG_BY_LEN = _group_signatures_by_length(FILE_SIGNATURES)
+    
     @classmethod
     def detect_file_type(cls, content: bytes, content_type: Optional[str] = None) -> Tuple[str, str]:
         """
@@ -50,10 +72,12 @@ class FileValidator:
         Returns:
             Tupla (extensão, tipo_detectado)
         """
-        # Primeiro, tentar detectar pela assinatura do arquivo
-        for signature, extension in cls.FILE_SIGNATURES.items():
-            if content.startswith(signature):
-                return extension, f"Detectado por assinatura: {signature}"
+        # Primeiro, tentar detectar pela assinatura do arquivo (uma consulta por tamanho de prefixo)
+        for length, signatures in cls._SIG_BY_LEN:
+            prefix = content[:length]
+            extension = signatures.get(prefix)
+            if extension:
+                return extension, f"Detectado por assinatura: {prefix}"
         
         # Se não encontrou assinatura, usar Content-Type
         if content_type:
@@ -81,7 +105,11 @@ class FileValidator:
             Nome de arquivo seguro
         """
         # Remover caracteres perigosos
-        safe_name = "".join(c for c in original_name if c.isalnum() or c in (' ', '-', '_', '.'))
+        safe_name = original_name.translate(_FILENAME_DELETE_TABLE)
+        try:
+            safe_name.encode('latin-1')
+        except UnicodeEncodeError:
+            safe_name = "".join(c for c in safe_name if c.isalnum() or c in _FILENAME_EXTRA_CHARS)
         safe_name = safe_name.strip()
         
         # Se o nome estiver vazio, usar nome genérico
@@ -128,8 +156,11 @@ class FileValidator:
         result['detected_type'] = detection_method
         result['extension'] = extension
         
+        # Início do conteúdo, reaproveitado nas verificações abaixo (sem copiar o arquivo inteiro)
+        head = content[:1000]
+        
         # Verificar se é HTML do portal (erro comum)
-        if content.startswith(b'<html') and b'portal' in content.lower()[:1000]:
+        if head.startswith(b'<html') and b'portal' in head.lower():
             result['warnings'].append("Possível HTML do portal web em vez do documento")
         
         # Verificar tamanho mínimo
@@ -138,15 +169,21 @@ class FileValidator:
         
         # Verificar se corresponde ao tipo esperado
         if expected_type:
-            if expected_type.lower() == 'pdf' and not content.startswith(b'%PDF'):
+            if expected_type.lower() == 'pdf' and not head.startswith(b'%PDF'):
                 result['warnings'].append("Esperado PDF mas não é um PDF válido")
-            elif expected_type.lower() == 'html' and not content.startswith(b'<'):
+            elif expected_type.lower() == 'html' and not head.startswith(b'<'):
                 result['warnings'].append("Esperado HTML mas não é HTML válido")
         
         return result
     
     @classmethod
-    def save_document(cls, content: bytes, filename: str, directory: str = "downloads") -> str:
+    def save_document(
+        cls,
+        content: bytes,
+        filename: str,
+        directory: str = "downloads",
+        extension: Optional[str] = None
+    ) -> str:
         """
         Salvar documento com validação e nome seguro.
         
@@ -154,6 +191,7 @@ class FileValidator:
             content: Conteúdo binário
             filename: Nome do arquivo
             directory: Diretório de destino
+            extension: Extensão já detectada (evita reanalisar o conteúdo)
             
         Returns:
             Caminho do arquivo salvo
@@ -161,16 +199,23 @@ class FileValidator:
         # Criar diretório se não existir
         os.makedirs(directory, exist_ok=True)
         
-        # Detectar tipo e gerar nome seguro
-        extension, _ = cls.detect_file_type(content)
+        # Detectar tipo (se ainda não detectado) e gerar nome seguro
+        if extension is None:
+            extension, _ = cls.detect_file_type(content)
         safe_filename = cls.get_safe_filename(filename, extension)
         
         # Caminho completo
         file_path = os.path.join(directory, safe_filename)
         
-        # Salvar arquivo
-        with open(file_path, 'wb') as f:
-            f.write(content)
+        # Salvar arquivo com escrita direta no descritor (sem o buffer do file object)
+        fd = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            view = memoryview(content)
+            while view:
+                written = os.write(fd, view)
+                view = view[written:]
+        finally:
+            os.close(fd)
         
         logger.info(f"💾 Arquivo salvo: {file_path} ({len(content)} bytes)")
         return file_path
@@ -196,7 +241,7 @@ def process_document_download(content: bytes, original_name: str, content_type:
     
     # Salvar arquivo
     if validation['is_valid']:
-        file_path = FileValidator.save_document(content, original_name, directory)
+        file_path = FileValidator.save_document(content, original_name, directory, validation['extension'])
         validation['saved_path'] = file_path
     else:
         validation['saved_path'] = None
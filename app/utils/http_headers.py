@@ -2,98 +2,147 @@
 Configuração centralizada de headers HTTP para diferentes tipos de requisições.
 """
 
-from typing import Dict, Any, Optional
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Any, Mapping, Optional, Tuple, Union
 from datetime import datetime
 
 
+# Partes estáticas dos headers, montadas uma única vez (só o Authorization varia por chamada)
+_DEFAULT_HEADERS_BASE = MappingProxyType({
+    "Content-Type": "application/json",
+    "User-Agent": "PDPJ-API-Client/1.0",
+    "Accept": "application/json",
+    "Accept-Encoding": "gzip, deflate, br",
+    "Accept-Language": "pt-BR,pt;q=0.9,en;q=0.8",
+    "Cache-Control": "no-cache",
+    "Pragma": "no-cache"
+})
+
+_BROWSER_HEADERS_BASE = MappingProxyType({
+    "accept": "*/*",
+    "accept-encoding": "gzip, deflate, br, zstd",
+    "accept-language": "en-US,en;q=0.9,pt;q=0.8",
+    "priority": "u=1, i",
+    "sec-ch-ua": '"Chromium";v="140", "Not=A?Brand";v="24", "Google Chrome";v="140"',
+    "sec-ch-ua-mobile": "?0",
+    "sec-ch-ua-platform": '"macOS"',
+    "sec-fetch-dest": "empty",
+    "sec-fetch-mode": "cors",
+    "sec-fetch-site": "same-origin",
+    "user-agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36"
+})
+
+_SESSION_HEADERS_BASE = MappingProxyType({
+    "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
+    "accept-encoding": "gzip, deflate, br, zstd",
+    "accept-language": "pt-BR,pt;q=0.9,en;q=0.8",
+    "sec-ch-ua": '"Chromium";v="140", "Not=A?Brand";v="24", "Google Chrome";v="140"',
+    "sec-ch-ua-mobile": "?0",
+    "sec-ch-ua-platform": '"macOS"',
+    "sec-fetch-dest": "document",
+    "sec-fetch-mode": "navigate",
+    "sec-fetch-site": "none",
+    "sec-fetch-user": "?1",
+    "user-agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36"
+})
+
+_HEALTH_CHECK_HEADERS_BASE = MappingProxyType({
+    "Accept": "application/json",
+    "User-Agent": "PDPJ-Health-Check/1.0"
+})
+
+# Headers padrão já codificados (pares de bytes), repassados ao httpx sem nova codificação
+_DEFAULT_HEADERS_BYTES_STATIC = tuple(
+    (key.encode("ascii"), value.encode("ascii")) for key, value in _DEFAULT_HEADERS_BASE.items()
+)
+
+_REFERER_PREFIX = "https://portaldeservicos.pdpj.jus.br/consulta/autosdigitais?processo="
+_REFERER_SUFFIX = "&dataDistribuicao=20250130131052"
+
+
+def _bearer(token: str) -> str:
+    """Valor do header Authorization para o token."""
+    return "".join(("Bearer ", token))
+
+
+# Tamanho dos caches de headers por token (clientes de longa duração reutilizam o mesmo token)
+_HEADERS_CACHE_SIZE = 64
+
+
 class HTTPHeadersConfig:
-    """Configuração centralizada de headers HTTP."""
+    """Configuração centralizada de headers HTTP.
+    
+    Os headers são cacheados por token e retornados como mapeamentos somente leitura;
+    quem precisar alterá-los deve copiar antes (``dict(headers)``).
+    """
     
     @staticmethod
-    def get_default_headers(token: str) -> Dict[str, str]:
+    @lru_cache(maxsize=_HEADERS_CACHE_SIZE)
+    def get_default_headers(token: str) -> Mapping[str, str]:
         """Headers padrão para requisições da API PDPJ."""
-        return {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-            "User-Agent": "PDPJ-API-Client/1.0",
-            "Accept": "application/json",
-            "Accept-Encoding": "gzip, deflate, br",
-            "Accept-Language": "pt-BR,pt;q=0.9,en;q=0.8",
-            "Cache-Control": "no-cache",
-            "Pragma": "no-cache"
-        }
+        return MappingProxyType({"Authorization": _bearer(token), **_DEFAULT_HEADERS_BASE})
+    
+    @staticmethod
+    @lru_cache(maxsize=_HEADERS_CACHE_SIZE)
+    def get_default_headers_bytes(token: Union[str, bytes]) -> Tuple[Tuple[bytes, bytes], ...]:
+        """Headers padrão como pares de bytes (aceitos diretamente pelo httpx)."""
+        if isinstance(token, str):
+            token = token.encode("ascii")
+        return ((b"Authorization", b"Bearer " + token),) + _DEFAULT_HEADERS_BYTES_STATIC
+    
+    @staticmethod
+    @lru_cache(maxsize=_HEADERS_CACHE_SIZE)
+    def _get_browser_base_headers(token: str) -> Mapping[str, str]:
+        """Headers de navegador apenas com o token (variante sem cookie/referer)."""
+        return MappingProxyType({"authorization": _bearer(token), **_BROWSER_HEADERS_BASE})
     
     @staticmethod
     def get_browser_headers(token: str, session_cookie: Optional[str] = None, 
-                          process_number: Optional[str] = None) -> Dict[str, str]:
+                          process_number: Optional[str] = None) -> Mapping[str, str]:
         """Headers que simulam navegador para downloads de documentos."""
-        headers = {
-            "accept": "*/*",
-            "accept-encoding": "gzip, deflate, br, zstd",
-            "accept-language": "en-US,en;q=0.9,pt;q=0.8",
-            "authorization": f"Bearer {token}",
-            "priority": "u=1, i",
-            "sec-ch-ua": '"Chromium";v="140", "Not=A?Brand";v="24", "Google Chrome";v="140"',
-            "sec-ch-ua-mobile": "?0",
-            "sec-ch-ua-platform": '"macOS"',
-            "sec-fetch-dest": "empty",
-            "sec-fetch-mode": "cors",
-            "sec-fetch-site": "same-origin",
-            "user-agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36"
-        }
+        base_headers = HTTPHeadersConfig._get_browser_base_headers(token)
+        if not session_cookie and not process_number:
+            return base_headers
+        
+        headers = dict(base_headers)
         
         # Adicionar cookie se fornecido
         if session_cookie:
-            headers["cookie"] = f"JSESSIONID={session_cookie}"
+            headers["cookie"] = "".join(("JSESSIONID=", session_cookie))
         
         # Adicionar referer se processo fornecido
         if process_number:
-            headers["referer"] = f"https://portaldeservicos.pdpj.jus.br/consulta/autosdigitais?processo={process_number}&dataDistribuicao=20250130131052"
+            headers["referer"] = "".join((_REFERER_PREFIX, process_number, _REFERER_SUFFIX))
         
         return headers
     
     @staticmethod
-    def get_session_creation_headers(token: str) -> Dict[str, str]:
+    @lru_cache(maxsize=_HEADERS_CACHE_SIZE)
+    def get_session_creation_headers(token: str) -> Mapping[str, str]:
         """Headers para criação de sessão no portal."""
-        return {
-            "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
-            "accept-encoding": "gzip, deflate, br, zstd",
-            "accept-language": "pt-BR,pt;q=0.9,en;q=0.8",
-            "authorization": f"Bearer {token}",
-            "sec-ch-ua": '"Chromium";v="140", "Not=A?Brand";v="24", "Google Chrome";v="140"',
-            "sec-ch-ua-mobile": "?0",
-            "sec-ch-ua-platform": '"macOS"',
-            "sec-fetch-dest": "document",
-            "sec-fetch-mode": "navigate",
-            "sec-fetch-site": "none",
-            "sec-fetch-user": "?1",
-            "user-agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36"
-        }
+        return MappingProxyType({"authorization": _bearer(token), **_SESSION_HEADERS_BASE})
     
     @staticmethod
-    def get_health_check_headers(token: str) -> Dict[str, str]:
+    @lru_cache(maxsize=_HEADERS_CACHE_SIZE)
+    def get_health_check_headers(token: str) -> Mapping[str, str]:
         """Headers para health check da API."""
-        return {
-            "Authorization": f"Bearer {token}",
-            "Accept": "application/json",
-            "User-Agent": "PDPJ-Health-Check/1.0"
-        }
+        return MappingProxyType({"Authorization": _bearer(token), **_HEALTH_CHECK_HEADERS_BASE})
     
     @staticmethod
-    def update_headers_with_custom(original_headers: Dict[str, str], 
-                                 custom_headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
-        """Atualizar headers originais com headers customizados."""
+    def update_headers_with_custom(original_headers: Mapping[str, str], 
+                                 custom_headers: Optional[Dict[str, str]] = None) -> Mapping[str, str]:
+        """Atualizar headers originais com headers customizados (sem alterar os originais)."""
         if not custom_headers:
             return original_headers
         
-        updated_headers = original_headers.copy()
-        updated_headers.update(custom_headers)
-        return updated_headers
+        return {**original_headers, **custom_headers}
     
     @staticmethod
-    def get_headers_for_environment(environment: str, token: str) -> Dict[str, str]:
+    @lru_cache(maxsize=_HEADERS_CACHE_SIZE)
+    def get_headers_for_environment(environment: str, token: str) -> Mapping[str, str]:
         """Obter headers apropriados para o ambiente (dev, staging, prod)."""
-        base_headers = HTTPHeadersConfig.get_default_headers(token)
+        base_headers = dict(HTTPHeadersConfig.get_default_headers(token))
         
         if environment == "development":
             base_headers["X-Debug-Mode"] = "true"
@@ -105,22 +154,27 @@ class HTTPHeadersConfig:
             # Remover headers de debug se existirem
             base_headers.pop("X-Debug-Mode", None)
         
-        return base_headers
+        return MappingProxyType(base_headers)
 
 
 # Funções de conveniência
-def get_api_headers(token: str, custom_headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+def get_api_headers(token: str, custom_headers: Optional[Dict[str, str]] = None) -> Mapping[str, str]:
     """Obter headers para requisições da API."""
     headers = HTTPHeadersConfig.get_default_headers(token)
     return HTTPHeadersConfig.update_headers_with_custom(headers, custom_headers)
 
 
+def get_api_headers_bytes(token: str) -> Tuple[Tuple[bytes, bytes], ...]:
+    """Obter headers padrão da API já codificados em bytes (sem headers customizados)."""
+    return HTTPHeadersConfig.get_default_headers_bytes(token)
+
+
 def get_download_headers(token: str, session_cookie: Optional[str] = None, 
-                        process_number: Optional[str] = None) -> Dict[str, str]:
+                        process_number: Optional[str] = None) -> Mapping[str, str]:
     """Obter headers para download de documentos."""
     return HTTPHeadersConfig.get_browser_headers(token, session_cookie, process_number)
 
 
-def get_session_headers(token: str) -> Dict[str, str]:
+def get_session_headers(token: str) -> Mapping[str, str]:
     """Obter headers para criação de sessão."""
     return HTTPHeadersConfig.get_session_creation_headers(token)
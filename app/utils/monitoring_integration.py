@@ -3,6 +3,7 @@ Integração com sistemas de monitoramento externo (Prometheus, Sentry, Datadog)
 """
 
 import time
+from collections import OrderedDict
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 from loguru import logger
@@ -21,6 +22,16 @@ except ImportError:
     SENTRY_AVAILABLE = False
     logger.warning("⚠️ Sentry SDK não disponível. Instale com: pip install sentry-sdk")
 
+# Tempo (s) em que a saída serializada do registry é reaproveitada entre scrapes
+METRICS_CACHE_TTL = 1.0
+# Máximo de filhos de métricas mantidos em cache (LRU; labels como task_id não se repetem)
+LABEL_CHILDREN_CACHE_SIZE = 1024
+_PROMETHEUS_UNAVAILABLE = "# Prometheus não disponível\n".encode('utf-8')
+
+def _noop(*args, **kwargs) -> None:
+    """Registro descartado quando nenhum backend de monitoramento está ativo."""
+    return None
+
 class MonitoringIntegration:
     """Integração com sistemas de monitoramento externo."""
     
@@ -28,6 +39,14 @@ class MonitoringIntegration:
         self.enable_prometheus = enable_prometheus and PROMETHEUS_AVAILABLE
         self.enable_sentry = enable_sentry and SENTRY_AVAILABLE
         
+        # Última saída de generate_latest: (instante monotônico, bytes)
+        self._metrics_cache = (0.0, b"")
+        
+        # Timestamp ISO do health check, reaproveitado dentro do mesmo segundo: (segundo, iso)
+        self._health_ts_cache = (0, "")
+        # Parte fixa do health check, por combinação de flags: ((prometheus, sentry), dict)
+        self._health_template = (None, {})
+        
         # Métricas Prometheus
         if self.enable_prometheus:
             self._setup_prometheus_metrics()
@@ -35,6 +54,26 @@ class MonitoringIntegration:
         # Configurar Sentry
         if self.enable_sentry:
             self._setup_sentry()
+        
+        # Flag única consultada nos registros (atualizar via set_sentry_enabled)
+        self._sentry_active = self.enable_sentry
+        
+        # Sem nenhum backend ativo, os registros viram no-op (nem os argumentos são processados)
+        if not (self.enable_prometheus or self.enable_sentry):
+            self.record_request = _noop
+            self.record_download = _noop
+            self.record_error = _noop
+            self.update_gauge_metrics = _noop
+    
+    def set_sentry_enabled(self, enabled: bool):
+        """Habilitar/desabilitar o envio de eventos ao Sentry em tempo de execução."""
+        self.enable_sentry = enabled and SENTRY_AVAILABLE
+        self._sentry_active = self.enable_sentry
+        
+        # Voltar aos métodos reais caso tenham sido trocados por no-op no __init__
+        if self.enable_sentry:
+            for name in ("record_request", "record_download", "record_error", "update_gauge_metrics"):
+                self.__dict__.pop(name, None)
     
     def _setup_prometheus_metrics(self):
         """Configurar métricas Prometheus."""
@@ -102,8 +141,24 @@ class MonitoringIntegration:
             registry=self.registry
         )
         
+        # Filhos já vinculados aos labels, por tupla de labels (evita labels() a cada registro)
+        self._label_children: "OrderedDict[tuple, Any]" = OrderedDict()
+        
         logger.info("📊 Métricas Prometheus configuradas")
     
+    def _child(self, metric, *label_values: str):
+        """Obter (e cachear) o filho de uma métrica para os valores de labels informados."""
+        key = (metric, label_values)
+        child = self._label_children.get(key)
+        if child is None:
+            child = metric.labels(*label_values)
+            self._label_children[key] = child
+            if len(self._label_children) > LABEL_CHILDREN_CACHE_SIZE:
+                self._label_children.popitem(last=False)
+        else:
+            self._label_children.move_to_end(key)
+        return child
+    
     def _setup_sentry(self):
         """Configurar Sentry para rastreamento de erros."""
         import os
@@ -112,22 +167,22 @@ class MonitoringIntegration:
         # Usar DSN do settings ou variável de ambiente
         sentry_dsn = settings.sentry_dsn.get_secret_value() if settings.sentry_dsn else os.getenv("SENTRY_DSN")
         
-        if sentry_dsn:
-            # Configuração básica do Sentry
-            sentry_sdk.init(
-                dsn=sentry_dsn,
-                traces_sample_rate=0.1,  # 10% das transações
-                profiles_sample_rate=0.1,  # 10% dos perfis
-                environment=settings.environment,  # Usar ambiente do settings
-                send_default_pii=True,  # Incluir dados pessoais se necessário
-            )
-        else:
+        if not sentry_dsn:
             logger.warning("⚠️ SENTRY_DSN não configurado")
             self.enable_sentry = False
+            return
+        
+        # Configuração básica do Sentry
+        sentry_sdk.init(
+            dsn=sentry_dsn,
+            traces_sample_rate=0.1,  # 10% das transações
+            profiles_sample_rate=0.1,  # 10% dos perfis
+            environment=settings.environment,  # Usar ambiente do settings
+            send_default_pii=True,  # Incluir dados pessoais se necessário
+        )
         
         # Adicionar tags padrão
-        sentry_sdk.set_tag("service", "pdpj-client")
-        sentry_sdk.set_tag("version", "2.0.0")
+        sentry_sdk.set_tags({"service": "pdpj-client", "version": "2.0.0"})
         
         logger.info("🚨 Sentry configurado para rastreamento de erros")
     
@@ -135,74 +190,59 @@ class MonitoringIntegration:
         """Registrar métricas de requisição."""
         if self.enable_prometheus:
             # Incrementar contador
-            self.pdpj_requests_total.labels(
-                method=method,
-                endpoint=endpoint,
-                status=str(status_code)
-            ).inc()
+            self._child(self.pdpj_requests_total, method, endpoint, str(status_code)).inc()
             
             # Registrar duração
-            self.pdpj_request_duration.labels(
-                method=method,
-                endpoint=endpoint
-            ).observe(duration)
+            self._child(self.pdpj_request_duration, method, endpoint).observe(duration)
         
         # Enviar para Sentry se erro
-        if self.enable_sentry and status_code >= 400:
-            with sentry_sdk.push_scope() as scope:
-                scope.set_tag("endpoint", endpoint)
-                scope.set_tag("method", method)
-                scope.set_tag("status_code", status_code)
-                scope.set_context("request", {
+        if self._sentry_active and status_code >= 400:
+            # Tags/contextos passados direto para o evento (sem push/pop de escopo)
+            sentry_sdk.capture_message(
+                f"Erro HTTP {status_code} em {method} {endpoint}",
+                tags={"endpoint": endpoint, "method": method, "status_code": status_code},
+                contexts={"request": {
                     "method": method,
                     "endpoint": endpoint,
                     "duration": duration
-                })
-                sentry_sdk.capture_message(f"Erro HTTP {status_code} em {method} {endpoint}")
+                }}
+            )
     
     def record_download(self, status: str, file_type: str, duration: float, size: int = 0):
         """Registrar métricas de download."""
         if self.enable_prometheus:
             # Incrementar contador
-            self.pdpj_downloads_total.labels(
-                status=status,
-                file_type=file_type
-            ).inc()
+            self._child(self.pdpj_downloads_total, status, file_type).inc()
             
             # Registrar duração
-            self.pdpj_download_duration.labels(
-                file_type=file_type
-            ).observe(duration)
+            self._child(self.pdpj_download_duration, file_type).observe(duration)
         
         # Enviar para Sentry se falha
-        if self.enable_sentry and status == "failed":
-            with sentry_sdk.push_scope() as scope:
-                scope.set_tag("file_type", file_type)
-                scope.set_context("download", {
+        if self._sentry_active and status == "failed":
+            sentry_sdk.capture_message(
+                f"Falha no download de arquivo {file_type}",
+                tags={"file_type": file_type},
+                contexts={"download": {
                     "file_type": file_type,
                     "duration": duration,
                     "size": size
-                })
-                sentry_sdk.capture_message(f"Falha no download de arquivo {file_type}")
+                }}
+            )
     
     def record_error(self, error_type: str, endpoint: str, error_message: str):
         """Registrar erro."""
         if self.enable_prometheus:
-            self.pdpj_errors_total.labels(
-                error_type=error_type,
-                endpoint=endpoint
-            ).inc()
+            self._child(self.pdpj_errors_total, error_type, endpoint).inc()
         
-        if self.enable_sentry:
-            with sentry_sdk.push_scope() as scope:
-                scope.set_tag("error_type", error_type)
-                scope.set_tag("endpoint", endpoint)
-                scope.set_context("error", {
+        if self._sentry_active:
+            sentry_sdk.capture_exception(
+                tags={"error_type": error_type, "endpoint": endpoint},
+                contexts={"error": {
                     "type": error_type,
                     "endpoint": endpoint,
                     "message": error_message
-                })
-                sentry_sdk.capture_exception()
+                }}
+            )
     
     def update_gauge_metrics(self, metrics: Dict[str, Any]):
         """Atualizar métricas de gauge com dados do cliente PDPJ."""
@@ -215,39 +255,55 @@ class MonitoringIntegration:
         self.pdpj_cache_hit_rate.set(metrics.get('session_cache_hit_rate', 0.0))
         self.pdpj_success_rate.set(metrics.get('success_rate', 0.0))
     
-    def get_prometheus_metrics(self) -> str:
-        """Obter métricas Prometheus em formato texto."""
+    def get_prometheus_metrics_bytes(self) -> bytes:
+        """Obter métricas Prometheus serializadas, reaproveitando a saída por METRICS_CACHE_TTL."""
         if not self.enable_prometheus:
-            return "# Prometheus não disponível\n"
+            return _PROMETHEUS_UNAVAILABLE
+        
+        now = time.monotonic()
+        cached_at, payload = self._metrics_cache
+        if now - cached_at < METRICS_CACHE_TTL:
+            return payload
         
-        return generate_latest(self.registry).decode('utf-8')
+        payload = generate_latest(self.registry)
+        self._metrics_cache = (now, payload)
+        return payload
     
-    def create_health_check_endpoint(self) -> Dict[str, Any]:
-        """Criar endpoint de health check para monitoramento."""
-        health_status = {
-            "status": "healthy",
-            "timestamp": datetime.utcnow().isoformat(),
-            "version": "2.0.0",
-            "monitoring": {
-                "prometheus_enabled": self.enable_prometheus,
-                "sentry_enabled": self.enable_sentry
+    def get_prometheus_metrics(self) -> str:
+        """Obter métricas Prometheus em formato texto."""
+        return self.get_prometheus_metrics_bytes().decode('utf-8')
+    
+    def _get_health_template(self) -> Dict[str, Any]:
+        """Obter a parte fixa do health check (refeita só se as flags mudarem)."""
+        flags = (self.enable_prometheus, self.enable_sentry)
+        if self._health_template[0] != flags:
+            template = {
+                "status": "healthy",
+                "version": "2.0.0",
+                "monitoring": {
+                    "prometheus_enabled": self.enable_prometheus,
+                    "sentry_enabled": self.enable_sentry
+                }
             }
-        }
-        
-        # Adicionar métricas básicas se Prometheus estiver disponível
-        if self.enable_prometheus:
-            try:
-                # Obter algumas métricas básicas
-                health_status["metrics"] = {
+            
+            # Adicionar métricas básicas se Prometheus estiver disponível
+            if self.enable_prometheus:
+                template["metrics"] = {
                     "requests_total": "available",
                     "downloads_total": "available",
                     "errors_total": "available"
                 }
-            except Exception as e:
-                health_status["status"] = "degraded"
-                health_status["error"] = str(e)
+            
+            self._health_template = (flags, template)
+        return self._health_template[1]
+    
+    def create_health_check_endpoint(self) -> Dict[str, Any]:
+        """Criar endpoint de health check para monitoramento."""
+        now = int(time.time())
+        if now != self._health_ts_cache[0]:
+            self._health_ts_cache = (now, datetime.utcfromtimestamp(now).isoformat())
         
-        return health_status
+        return {**self._get_health_template(), "timestamp": self._health_ts_cache[1]}
 
 # Instância global para uso em toda a aplicação
 monitoring = MonitoringIntegration()
@@ -276,3 +332,7 @@ def get_health_status() -> Dict[str, Any]:
 def get_prometheus_metrics() -> str:
     """Obter métricas Prometheus."""
     return monitoring.get_prometheus_metrics()
+
+def get_prometheus_metrics_bytes() -> bytes:
+    """Obter métricas Prometheus já serializadas (sem decodificar)."""
+    return monitoring.get_prometheus_metrics_bytes()
@@ -2,17 +2,29 @@
 Utilitários para paginação de resultados.
 """
 
-from typing import List, Dict, Any, Optional, Tuple
+from dataclasses import dataclass
+from typing import Annotated, List, Dict, Any, Literal, Optional, Tuple
 from fastapi import Query
 from pydantic import BaseModel, Field
-from sqlalchemy import select
+from sqlalchemy import func, select
 from app.models import Process, Document
 
 
-class PaginationParams(BaseModel):
-    """Parâmetros de paginação."""
-    skip: int = Field(default=0, ge=0, description="Número de itens a pular")
-    limit: int = Field(default=100, ge=1, le=1000, description="Número máximo de itens por página")
+@dataclass(slots=True, frozen=True)
+class PaginationParams:
+    """Parâmetros de paginação.
+    
+    Dataclass simples (sem validação Pydantic por requisição): os valores vêm de
+    ``Query(...)``, que já valida os limites; aqui só há a checagem de intervalo.
+    """
+    skip: int = 0  # Número de itens a pular
+    limit: int = 100  # Número máximo de itens por página (1-1000)
+    
+    def __post_init__(self):
+        if self.skip < 0:
+            raise ValueError("skip deve ser >= 0")
+        if not 1 <= self.limit <= 1000:
+            raise ValueError("limit deve estar entre 1 e 1000")
     
     @property
     def offset(self) -> int:
@@ -25,6 +37,32 @@ class PaginationParams(BaseModel):
         return (self.skip // self.limit) + 1
 
 
+# Colunas permitidas para ordenação (lookup O(1) e allow-list contra colunas arbitrárias)
+_DOC_SORT_COLS = {
+    name: getattr(Document, name)
+    for name in (
+        "id", "document_id", "name", "type", "size", "mime_type",
+        "created_at", "updated_at", "downloaded", "available"
+    )
+}
+_PROC_SORT_COLS = {
+    name: getattr(Process, name)
+    for name in (
+        "id", "process_number", "court", "subject", "status", "created_at",
+        "updated_at", "last_consultation", "has_documents", "documents_downloaded"
+    )
+}
+
+
+# Parâmetros de query reutilizáveis (validados pelo FastAPI; sort_by restrito às allow-lists)
+SkipParam = Annotated[int, Query(ge=0, description="Número de itens a pular")]
+LimitParam = Annotated[int, Query(ge=1, le=1000, description="Número máximo de itens por página")]
+DocumentLimitParam = Annotated[int, Query(ge=1, le=500, description="Número máximo de documentos por página")]
+SortOrderParam = Annotated[str, Query(description="Ordem da ordenação (asc/desc)")]
+DocumentSortByParam = Annotated[Literal[tuple(_DOC_SORT_COLS)], Query(description="Campo para ordenação")]
+ProcessSortByParam = Annotated[Literal[tuple(_PROC_SORT_COLS)], Query(description="Campo para ordenação")]
+
+
 class PaginatedResponse(BaseModel):
     """Resposta paginada."""
     items: List[Any] = Field(description="Lista de itens da página atual")
@@ -38,8 +76,8 @@ class PaginatedResponse(BaseModel):
 
 
 def create_pagination_params(
-    skip: int = Query(0, ge=0, description="Número de itens a pular"),
-    limit: int = Query(100, ge=1, le=1000, description="Número máximo de itens por página")
+    skip: SkipParam = 0,
+    limit: LimitParam = 100
 ) -> PaginationParams:
     """Criar parâmetros de paginação para endpoints FastAPI."""
     return PaginationParams(skip=skip, limit=limit)
@@ -51,24 +89,22 @@ def paginate_results(
     pagination: PaginationParams
 ) -> PaginatedResponse:
     """Criar resposta paginada."""
-    pages = (total + pagination.limit - 1) // pagination.limit  # Ceiling division
+    pages = -(-total // pagination.limit)  # Ceiling division
     current_page = pagination.page
     
     has_next = current_page < pages
     has_prev = current_page > 1
     
-    next_page = current_page + 1 if has_next else None
-    prev_page = current_page - 1 if has_prev else None
-    
-    return PaginatedResponse(
+    # Valores calculados aqui mesmo e já com os tipos corretos: sem validação Pydantic
+    return PaginatedResponse.model_construct(
         items=items,
         total=total,
         page=current_page,
         pages=pages,
         has_next=has_next,
         has_prev=has_prev,
-        next_page=next_page,
-        prev_page=prev_page
+        next_page=current_page + 1 if has_next else None,
+        prev_page=current_page - 1 if has_prev else None
     )
 
 
@@ -77,21 +113,44 @@ def apply_pagination_to_query(query, pagination: PaginationParams):
     return query.offset(pagination.offset).limit(pagination.limit)
 
 
+def apply_pagination_with_count(query, pagination: PaginationParams):
+    """Aplicar paginação incluindo o total de itens (COUNT(*) OVER ()) em cada linha.
+    
+    Evita uma segunda ida ao banco só para contar; use ``split_rows_with_total``
+    para separar itens e total do resultado.
+    """
+    query = query.add_columns(func.count().over().label("_total"))
+    return apply_pagination_to_query(query, pagination)
+
+
+def split_rows_with_total(rows) -> Tuple[List[Any], Optional[int]]:
+    """Separar itens e total das linhas de uma query com ``apply_pagination_with_count``.
+    
+    Returns:
+        Tupla (itens, total); total é None quando a página veio vazia e
+        o total não pôde ser obtido das linhas (ex.: skip além do fim).
+    """
+    if not rows:
+        return [], None
+    return [row[0] for row in rows], rows[0]._total
+
+
+@dataclass(slots=True, frozen=True)
 class DocumentPaginationParams(PaginationParams):
     """Parâmetros de paginação específicos para documentos."""
-    sort_by: str = Field(default="created_at", description="Campo para ordenação")
-    sort_order: str = Field(default="desc", description="Ordem da ordenação (asc/desc)")
-    filter_type: Optional[str] = Field(default=None, description="Filtrar por tipo de documento")
-    filter_downloaded: Optional[bool] = Field(default=None, description="Filtrar por status de download")
+    sort_by: str = "created_at"  # Campo para ordenação
+    sort_order: str = "desc"  # Ordem da ordenação (asc/desc)
+    filter_type: Optional[str] = None  # Filtrar por tipo de documento
+    filter_downloaded: Optional[bool] = None  # Filtrar por status de download
 
 
 def create_document_pagination_params(
-    skip: int = Query(0, ge=0, description="Número de documentos a pular"),
-    limit: int = Query(50, ge=1, le=500, description="Número máximo de documentos por página"),
-    sort_by: str = Query("created_at", description="Campo para ordenação"),
-    sort_order: str = Query("desc", description="Ordem da ordenação (asc/desc)"),
-    filter_type: Optional[str] = Query(None, description="Filtrar por tipo de documento"),
-    filter_downloaded: Optional[bool] = Query(None, description="Filtrar por status de download")
+    skip: SkipParam = 0,
+    limit: DocumentLimitParam = 50,
+    sort_by: DocumentSortByParam = "created_at",
+    sort_order: SortOrderParam = "desc",
+    filter_type: Annotated[Optional[str], Query(description="Filtrar por tipo de documento")] = None,
+    filter_downloaded: Annotated[Optional[bool], Query(description="Filtrar por status de download")] = None
 ) -> DocumentPaginationParams:
     """Criar parâmetros de paginação para documentos."""
     return DocumentPaginationParams(
@@ -104,7 +163,7 @@ def create_document_pagination_params(
     )
 
 
-def apply_document_filters(query, pagination: DocumentPaginationParams):
+def apply_document_filters(query, pagination: DocumentPaginationParams, with_total: bool = False):
     """Aplicar filtros e ordenação para documentos."""
     # Aplicar filtros
     if pagination.filter_type:
@@ -114,31 +173,34 @@ def apply_document_filters(query, pagination: DocumentPaginationParams):
         query = query.filter(Document.downloaded == pagination.filter_downloaded)
     
     # Aplicar ordenação
-    sort_column = getattr(Document, pagination.sort_by, Document.created_at)
+    sort_column = _DOC_SORT_COLS.get(pagination.sort_by, Document.created_at)
     if pagination.sort_order.lower() == "desc":
         query = query.order_by(sort_column.desc())
     else:
         query = query.order_by(sort_column.asc())
     
-    # Aplicar paginação
+    # Aplicar paginação (opcionalmente com o total na mesma query)
+    if with_total:
+        return apply_pagination_with_count(query, pagination)
     return apply_pagination_to_query(query, pagination)
 
 
+@dataclass(slots=True, frozen=True)
 class ProcessPaginationParams(PaginationParams):
     """Parâmetros de paginação específicos para processos."""
-    sort_by: str = Field(default="updated_at", description="Campo para ordenação")
-    sort_order: str = Field(default="desc", description="Ordem da ordenação (asc/desc)")
-    filter_court: Optional[str] = Field(default=None, description="Filtrar por tribunal")
-    filter_has_documents: Optional[bool] = Field(default=None, description="Filtrar por presença de documentos")
+    sort_by: str = "updated_at"  # Campo para ordenação
+    sort_order: str = "desc"  # Ordem da ordenação (asc/desc)
+    filter_court: Optional[str] = None  # Filtrar por tribunal
+    filter_has_documents: Optional[bool] = None  # Filtrar por presença de documentos
 
 
 def create_process_pagination_params(
-    skip: int = Query(0, ge=0, description="Número de processos a pular"),
-    limit: int = Query(100, ge=1, le=1000, description="Número máximo de processos por página"),
-    sort_by: str = Query("updated_at", description="Campo para ordenação"),
-    sort_order: str = Query("desc", description="Ordem da ordenação (asc/desc)"),
-    filter_court: Optional[str] = Query(None, description="Filtrar por tribunal"),
-    filter_has_documents: Optional[bool] = Query(None, description="Filtrar por presença de documentos")
+    skip: SkipParam = 0,
+    limit: LimitParam = 100,
+    sort_by: ProcessSortByParam = "updated_at",
+    sort_order: SortOrderParam = "desc",
+    filter_court: Annotated[Optional[str], Query(description="Filtrar por tribunal")] = None,
+    filter_has_documents: Annotated[Optional[bool], Query(description="Filtrar por presença de documentos")] = None
 ) -> ProcessPaginationParams:
     """Criar parâmetros de paginação para processos."""
     return ProcessPaginationParams(
@@ -151,7 +213,7 @@ def create_process_pagination_params(
     )
 
 
-def apply_process_filters(query, pagination: ProcessPaginationParams):
+def apply_process_filters(query, pagination: ProcessPaginationParams, with_total: bool = False):
     """Aplicar filtros e ordenação para processos."""
     # Aplicar filtros
     if pagination.filter_court:
@@ -161,11 +223,13 @@ def apply_process_filters(query, pagination: ProcessPaginationParams):
         query = query.filter(Process.has_documents == pagination.filter_has_documents)
     
     # Aplicar ordenação
-    sort_column = getattr(Process, pagination.sort_by, Process.updated_at)
+    sort_column = _PROC_SORT_COLS.get(pagination.sort_by, Process.updated_at)
     if pagination.sort_order.lower() == "desc":
         query = query.order_by(sort_column.desc())
     else:
         query = query.order_by(sort_column.asc())
     
-    # Aplicar paginação
+    # Aplicar paginação (opcionalmente com o total na mesma query)
+    if with_total:
+        return apply_pagination_with_count(query, pagination)
     return apply_pagination_to_query(query, pagination)
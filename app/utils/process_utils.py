@@ -1,7 +1,15 @@
 """Utilitários para processamento de números de processo judicial."""
 
 import re
-from typing import Optional
+from typing import Iterable, List, Optional
+
+
+# Tabela para str.translate que remove todo caractere latin-1 que não seja dígito
+_NON_DIGITS_TABLE = str.maketrans('', '', ''.join(chr(c) for c in range(256) if not chr(c).isdecimal()))
+# Fallback para entradas com caracteres fora do latin-1
+_NON_DIGITS_RE = re.compile(r'[^\d]')
+# Formato de exibição NNNNNNN-DD.AAAA.J.TR.OOOO
+_CNJ_FORMAT = "{}-{}.{}.{}.{}.{}".format
 
 
 def normalize_process_number(process_number: str) -> str:
@@ -18,11 +26,30 @@ def normalize_process_number(process_number: str) -> str:
         return ""
     
     # Remove pontos, hífens, espaços e outros caracteres não numéricos
-    normalized = re.sub(r'[^\d]', '', process_number)
+    normalized = process_number.translate(_NON_DIGITS_TABLE)
+    if not normalized.isascii():
+        normalized = _NON_DIGITS_RE.sub('', normalized)
     
     return normalized
 
 
+def normalize_process_numbers(process_numbers: Iterable[str]) -> List[str]:
+    """
+    Normaliza vários números de processo (ex: linhas de um CSV de lote).
+    
+    O loop por caractere roda em C (``str.translate``); só entradas com caracteres
+    fora do latin-1 passam pelo fallback com regex.
+    
+    Args:
+        process_numbers: Números do processo, formatados ou não
+        
+    Returns:
+        Lista com os números normalizados, na mesma ordem
+    """
+    normalized = [pn.translate(_NON_DIGITS_TABLE) if pn else "" for pn in process_numbers]
+    return [pn if pn.isascii() else _NON_DIGITS_RE.sub('', pn) for pn in normalized]
+
+
 def format_process_number(process_number: str) -> str:
     """
     Formata um número de processo normalizado para exibição.
@@ -39,7 +66,10 @@ def format_process_number(process_number: str) -> str:
     # Formato: NNNNNNN-DD.AAAA.J.TR.OOOO
     # Exemplo: 1000145-91.2023.8.26.0597
     if len(process_number) == 20:
-        return f"{process_number[:7]}-{process_number[7:9]}.{process_number[9:13]}.{process_number[13:14]}.{process_number[14:16]}.{process_number[16:20]}"
+        return _CNJ_FORMAT(
+            process_number[:7], process_number[7:9], process_number[9:13],
+            process_number[13:14], process_number[14:16], process_number[16:20]
+        )
     
     return process_number
 
@@ -57,8 +87,5 @@ def validate_process_number(process_number: str) -> bool:
     if not process_number:
         return False
     
-    # Normalizar primeiro
-    normalized = normalize_process_number(process_number)
-    
-    # Deve ter exatamente 20 dígitos
-    return len(normalized) == 20 and normalized.isdigit()
+    # Exatamente 20 dígitos, com quaisquer separadores (normalização via str.translate)
+    return len(normalize_process_number(process_number)) == 20
@@ -4,10 +4,57 @@ Utilitário para validação de tokens JWT da API PDPJ.
 
 import json
 import base64
+import re
+import time
 from datetime import datetime
-from typing import Dict, Any, Optional
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Mapping, Optional
 from loguru import logger
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+    ORJSON_AVAILABLE = True
+except ImportError:
+    _json_loads = json.loads
+    ORJSON_AVAILABLE = False
+
+
+# Domínio (host[:porta]) de uma URL com ou sem esquema http(s), em uma única passada
+_DOMAIN_RE = re.compile(r'(?:https?://)?([^/]*)')
+
+
+def _url_domain(url: str) -> str:
+    """Extrair o domínio de uma URL/origin."""
+    return _DOMAIN_RE.match(url).group(1)
+
+
+# Tokens maiores que isso não são decodificados (nem entram no cache)
+_MAX_TOKEN_LENGTH = 16 * 1024
+
+
+@lru_cache(maxsize=256)
+def _decode_payload(token_str: str) -> Optional[Mapping[str, Any]]:
+    """Decodificar o payload de um JWT (cacheado por token).
+    
+    Returns:
+        Payload decodificado como mapping somente leitura (a mesma instância é devolvida a
+        todos os chamadores do cache), ou None se o token não tiver o formato de JWT.
+    
+    Raises:
+        ValueError: se o payload não for base64/JSON válido (orjson.JSONDecodeError é subclasse).
+    """
+    # Localizar os dois pontos do JWT e fatiar só o payload (sem split em lista)
+    first_dot = token_str.find('.')
+    second_dot = token_str.find('.', first_dot + 1)
+    if first_dot < 0 or second_dot < 0 or token_str.find('.', second_dot + 1) != -1:
+        return None
+    
+    payload = token_str[first_dot + 1:second_dot]
+    decoded = base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4))
+    return MappingProxyType(_json_loads(decoded))
+
 
 class TokenValidationResult:
     """Resultado da validação de token."""
@@ -56,32 +103,35 @@ class PDPJTokenValidator:
                 token_str = token.get_secret_value()
             else:
                 token_str = str(token)
-            parts = token_str.split('.')
-            if len(parts) != 3:
+            if len(token_str) > _MAX_TOKEN_LENGTH:
+                result.is_valid = False
+                result.errors.append("Token excede o tamanho máximo suportado")
+                logger.warning("⚠️ Token excede o tamanho máximo suportado")
+                return result
+            
+            # Decodificar payload (uma vez por token distinto)
+            payload_data = _decode_payload(token_str)
+            if payload_data is None:
                 result.is_valid = False
                 result.warnings.append("Token não é um JWT válido")
                 logger.warning("⚠️ Token não é um JWT válido")
                 return result
             
-            # Decodificar payload
-            payload = parts[1]
-            payload += '=' * (4 - len(payload) % 4)
-            decoded = base64.urlsafe_b64decode(payload)
-            payload_data = json.loads(decoded)
-            
             # Verificar expiração
-            if 'exp' in payload_data:
-                exp_date = datetime.fromtimestamp(payload_data['exp'])
-                now = datetime.now()
+            exp_ts = payload_data.get('exp')
+            if exp_ts is not None:
+                now_ts = time.time()
                 
-                if now > exp_date:
+                if now_ts > exp_ts:
+                    # datetime só no caminho de erro, para a mensagem legível
+                    exp_date = datetime.fromtimestamp(exp_ts)
                     result.is_valid = False
                     result.is_expired = True
                     result.errors.append(f"Token expirado em {exp_date}")
                     logger.error(f"❌ Token PDPJ expirado em {exp_date}")
                     return result
                 else:
-                    hours_left = (exp_date - now).total_seconds() / 3600
+                    hours_left = (exp_ts - now_ts) / 3600.0
                     result.hours_remaining = hours_left
                     logger.info(f"✅ Token PDPJ válido por mais {hours_left:.1f} horas")
             
@@ -106,14 +156,14 @@ class PDPJTokenValidator:
             
             # Verificar allowed-origins
             allowed_origins = payload_data.get('allowed-origins', [])
-            result.allowed_origins = allowed_origins
+            result.allowed_origins = list(allowed_origins)
             
             if allowed_origins:
                 logger.info(f"🔍 Origins permitidos: {allowed_origins}")
                 # Verificar se a base URL está nos origins (mais flexível)
                 if base_url:
-                    base_domain = base_url.replace('https://', '').replace('http://', '').split('/')[0]
-                    origins_domains = [origin.replace('https://', '').replace('http://', '').split('/')[0] for origin in allowed_origins]
+                    base_domain = _url_domain(base_url)
+                    origins_domains = {_url_domain(origin) for origin in allowed_origins}
                     if base_domain not in origins_domains:
                         logger.info(f"ℹ️ Base URL {base_url} usa domínio diferente dos origins, mas pode funcionar")
                     else:
@@ -44,4 +44,4 @@ echo "🔄 Para parar: Ctrl+C"
 echo ""
 
 # Iniciar Celery Worker
-celery -A app.tasks.celery_app worker --loglevel=info --concurrency=4
+celery -A app.tasks.celery_app worker --loglevel=info --concurrency=${CELERY_CONCURRENCY:-$(nproc 2>/dev/null || sysctl -n hw.ncpu)}
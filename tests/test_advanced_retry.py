@@ -0,0 +1,56 @@
+"""Testes para o retry avançado (Retry-After em respostas 429)."""
+
+import time
+import pytest
+import httpx
+from email.utils import formatdate
+from unittest.mock import AsyncMock, patch
+
+from app.utils.advanced_retry import AdvancedRetry, RetryConfig
+from app.services.pdpj_client import TransientPDPJError
+
+
+def rate_limited(retry_after: str) -> TransientPDPJError:
+    """Erro levantado pelo cliente PDPJ em um 429 com o header Retry-After informado."""
+    response = httpx.Response(429, headers={"Retry-After": retry_after})
+    return TransientPDPJError("Rate limit atingido", status_code=429, response=response)
+
+
+class TestRetryAfterHint:
+    """Testes para AdvancedRetry.retry_after_hint."""
+    
+    @pytest.fixture
+    def retry(self):
+        return AdvancedRetry(RetryConfig())
+    
+    def test_seconds(self, retry):
+        """Retry-After em segundos."""
+        assert retry.retry_after_hint(rate_limited("7")) == 7.0
+    
+    def test_http_date(self, retry):
+        """Retry-After como HTTP-date futura."""
+        hint = retry.retry_after_hint(rate_limited(formatdate(time.time() + 30, usegmt=True)))
+        assert 25 <= hint <= 30
+    
+    def test_past_date(self, retry):
+        """HTTP-date no passado não gera espera negativa."""
+        assert retry.retry_after_hint(rate_limited(formatdate(time.time() - 60, usegmt=True))) == 0.0
+    
+    def test_garbage(self, retry):
+        """Valor inválido é ignorado."""
+        assert retry.retry_after_hint(rate_limited("em breve")) is None
+    
+    def test_without_response(self, retry):
+        """Exceção sem resposta não tem dica."""
+        assert retry.retry_after_hint(TransientPDPJError("Timeout na requisição")) is None
+    
+    @pytest.mark.asyncio
+    async def test_execute_with_retry_honors_retry_after(self):
+        """Em 429 o intervalo do servidor substitui o backoff (limitado por max_delay)."""
+        retry = AdvancedRetry(RetryConfig(max_attempts=2, base_delay=0.1, max_delay=10.0, jitter=False))
+        func = AsyncMock(side_effect=[rate_limited("5"), "ok"])
+        
+        with patch("app.utils.advanced_retry.asyncio.sleep", new=AsyncMock()) as sleep:
+            assert await retry.execute_with_retry(func) == "ok"
+        
+        sleep.assert_awaited_once_with(5.0)
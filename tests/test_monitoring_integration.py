@@ -0,0 +1,41 @@
+"""Testes para os labels das métricas de monitoramento."""
+
+import pytest
+from unittest.mock import patch
+
+from app.services.pdpj_client import _metric_endpoint
+from app.utils.monitoring_integration import MonitoringIntegration
+
+
+class TestMetricEndpoint:
+    """Testes para o template de rota usado nos labels de endpoint."""
+    
+    @pytest.mark.parametrize("endpoint, expected", [
+        ("processos/1000145-91.2023.8.26.0597", "processos/{numero}"),
+        ("processos/10001459120238260597/documentos", "processos/{numero}/documentos"),
+        ("processos?numeroProcesso=10001459120238260597", "processos?numeroProcesso"),
+        ("processos/batch", "processos/batch"),
+        ("health", "health"),
+    ])
+    def test_route_template(self, endpoint, expected):
+        """Números de processo não entram no label."""
+        assert _metric_endpoint(endpoint) == expected
+
+
+class TestLabelChildrenCache:
+    """Testes para o cache de filhos de métricas."""
+    
+    def test_cache_is_bounded(self):
+        """O cache descarta os filhos menos usados ao passar do limite."""
+        monitoring = MonitoringIntegration(enable_prometheus=True, enable_sentry=False)
+        
+        with patch("app.utils.monitoring_integration.LABEL_CHILDREN_CACHE_SIZE", 3):
+            for task_id in ("a", "b", "c"):
+                monitoring.record_error("celery_task_failure", task_id, "erro")
+            monitoring.record_error("celery_task_failure", "a", "erro")
+            monitoring.record_error("celery_task_failure", "d", "erro")
+        
+        labels = [values for _, values in monitoring._label_children]
+        assert len(labels) == 3
+        assert ("celery_task_failure", "b") not in labels
+        assert ("celery_task_failure", "a") in labels
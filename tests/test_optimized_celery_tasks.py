@@ -0,0 +1,105 @@
+"""Testes para as tasks Celery otimizadas de busca em lote."""
+
+import time
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.tasks import optimized_celery_tasks as tasks
+from app.tasks.optimized_celery_tasks import _large_batch_wave, celery_app, process_large_batch
+
+
+async def fake_batch_search(self, process_numbers, include_documents, partial):
+    """Busca falsa: falha quando o sub-lote contém um número marcado com FAIL."""
+    if any(n.startswith("FAIL") for n in process_numbers):
+        raise RuntimeError("PDPJ indisponível")
+    results = partial or {"found": 0, "not_found": [], "errors": []}
+    results["found"] += len(process_numbers)
+    return results, []
+
+
+@pytest.fixture
+def eager_celery():
+    """Executar as tasks localmente (chord, retry e replace sem broker nem Redis)."""
+    previous = celery_app.conf.task_always_eager, celery_app.conf.result_backend
+    celery_app.conf.task_always_eager = True
+    celery_app.conf.result_backend = "cache+memory://"
+    celery_app._local.__dict__.pop("backend", None)
+    with patch.object(tasks, "_process_batch_search_optimized", fake_batch_search), \
+         patch.object(tasks, "record_request_metrics"):
+        yield
+    celery_app.conf.task_always_eager, celery_app.conf.result_backend = previous
+    celery_app._local.__dict__.pop("backend", None)
+
+
+class TestLargeBatchChord:
+    """Testes para o chord de sub-lotes de process_large_batch."""
+    
+    def test_failed_sub_batch_is_consolidated(self, eager_celery):
+        """Sub-lote que esgota as retentativas vira erro no resultado, sem perder os demais."""
+        numbers = ["1", "2", "FAIL-3", "4", "5"]
+        
+        result = _large_batch_wave(numbers, 2, len(numbers), "batch-1", time.time()).apply().get()
+        
+        assert result["processed"] == 3
+        assert len(result["errors"]) == 1
+        assert result["errors"][0]["sub_batch"] == 2
+        assert "PDPJ indisponível" in result["errors"][0]["error"]
+    
+    def test_all_sub_batches_succeed(self, eager_celery):
+        """Sem falhas, todos os processos são consolidados."""
+        numbers = [str(n) for n in range(5)]
+        
+        result = _large_batch_wave(numbers, 2, len(numbers), "batch-2", time.time()).apply().get()
+        
+        assert result["processed"] == 5
+        assert result["errors"] == []
+    
+    def test_waves_accumulate_partial_results(self, eager_celery):
+        """Ondas seguintes são agendadas mesmo com falha e acumulam o parcial."""
+        numbers = ["1", "FAIL-2", "3", "4", "5", "FAIL-6", "7"]
+        
+        with patch.object(tasks, "MAX_IN_FLIGHT_SUB_BATCHES", 2):
+            result = _large_batch_wave(numbers, 1, len(numbers), "batch-3", time.time()).apply().get()
+        
+        assert result["processed"] == 5
+        assert result["total_requested"] == 7
+        assert [error["sub_batch"] for error in result["errors"]] == [2, 6]
+
+
+class TestProcessLargeBatch:
+    """Testes para o coordenador process_large_batch."""
+    
+    def test_normalizes_before_dedup(self, eager_celery):
+        """Mesmo processo formatado e não formatado conta como duplicado."""
+        numbers = ["1000145-91.2023.8.26.0597", "10001459120238260597", "1000146-91.2023.8.26.0597"]
+        wave = MagicMock(wraps=_large_batch_wave)
+        
+        with patch.object(tasks, "_large_batch_wave", wave):
+            result = process_large_batch.apply(args=(numbers,)).get()
+        
+        assert result["total_requested"] == 3
+        assert result["duplicates_removed"] == 1
+        assert wave.call_args.args[0] == ["10001459120238260597", "10001469120238260597"]
+
+
+class TestProcessBatchSearchOptimized:
+    """Testes para o corpo de process_batch_search_optimized."""
+    
+    @pytest.mark.asyncio
+    async def test_normalizes_before_dedup(self):
+        """Mesmo processo formatado e não formatado é buscado uma vez."""
+        task = MagicMock()
+        task.limits.max_batch_size = 100
+        task.limits.max_concurrent_requests = 4
+        chunk = AsyncMock(return_value={"found": 1, "not_found": [], "errors": []})
+        
+        with patch.object(tasks, "process_chunk_optimized", chunk), \
+             patch.object(tasks, "_memory_pressure", return_value=False), \
+             patch.object(tasks, "record_request_metrics"):
+            results, remaining = await tasks._process_batch_search_optimized(
+                task, ["1000145-91.2023.8.26.0597", "10001459120238260597"], False, None
+            )
+        
+        assert results["duplicates_removed"] == 1
+        assert remaining == []
+        chunk.assert_awaited_once_with(["10001459120238260597"], False)
@@ -0,0 +1,52 @@
+"""Testes para os parâmetros de paginação dos endpoints."""
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.utils.pagination_utils import (
+    DocumentPaginationParams,
+    ProcessPaginationParams,
+    create_document_pagination_params,
+    create_process_pagination_params
+)
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    
+    @app.get("/processes")
+    async def list_processes(pagination: ProcessPaginationParams = Depends(create_process_pagination_params)):
+        return {"sort_by": pagination.sort_by}
+    
+    @app.get("/files")
+    async def list_files(pagination: DocumentPaginationParams = Depends(create_document_pagination_params)):
+        return {"sort_by": pagination.sort_by}
+    
+    return TestClient(app)
+
+
+class TestSortByParam:
+    """Testes para a allow-list de sort_by."""
+    
+    def test_default_sort_by(self, client):
+        """Sem sort_by, a ordenação padrão é usada."""
+        assert client.get("/processes").json() == {"sort_by": "updated_at"}
+        assert client.get("/files").json() == {"sort_by": "created_at"}
+    
+    def test_allowed_sort_by(self, client):
+        """Coluna da allow-list é aceita."""
+        response = client.get("/processes", params={"sort_by": "court"})
+        assert response.status_code == 200
+        assert response.json() == {"sort_by": "court"}
+        
+        response = client.get("/files", params={"sort_by": "size"})
+        assert response.status_code == 200
+        assert response.json() == {"sort_by": "size"}
+    
+    @pytest.mark.parametrize("path", ["/processes", "/files"])
+    def test_disallowed_sort_by(self, client, path):
+        """Coluna fora da allow-list retorna 422."""
+        response = client.get(path, params={"sort_by": "full_data; DROP TABLE"})
+        assert response.status_code == 422
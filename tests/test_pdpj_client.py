@@ -0,0 +1,57 @@
+"""Testes para o download em streaming do cliente PDPJ."""
+
+import pytest
+import httpx
+from unittest.mock import AsyncMock, patch
+
+from app.services.pdpj_client import PDPJClient, PermanentPDPJError
+
+
+async def collect(client: PDPJClient, response: httpx.Response, **kwargs) -> bytes:
+    """Consumir stream_document com a resposta informada."""
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: response))
+    with patch.object(client, "_get_persistent_client", AsyncMock(return_value=http_client)):
+        chunks = [
+            chunk async for chunk in client.stream_document(
+                "/api/v2/processos/10001459120238260597/documentos/1/binario",
+                session_cookie="sessao",
+                process_number="10001459120238260597",
+                **kwargs
+            )
+        ]
+    await http_client.aclose()
+    return b"".join(chunks)
+
+
+class TestStreamDocument:
+    """Testes para PDPJClient.stream_document."""
+    
+    @pytest.fixture
+    def client(self):
+        return PDPJClient()
+    
+    @pytest.mark.asyncio
+    async def test_streams_document(self, client):
+        """Documento com conteúdo é repassado integralmente."""
+        response = httpx.Response(200, headers={"content-type": "application/pdf"}, content=b"%PDF-1.4 conteudo")
+        assert await collect(client, response) == b"%PDF-1.4 conteudo"
+    
+    @pytest.mark.asyncio
+    async def test_rejects_html_page(self, client):
+        """Página HTML (portal/login) com status 200 não é aceita como documento."""
+        response = httpx.Response(200, headers={"content-type": "text/html; charset=utf-8"}, content=b"<html>Login</html>")
+        with pytest.raises(PermanentPDPJError):
+            await collect(client, response)
+    
+    @pytest.mark.asyncio
+    async def test_accepts_expected_html(self, client):
+        """Documento que é HTML de fato continua sendo aceito."""
+        response = httpx.Response(200, headers={"content-type": "text/html"}, content=b"<html>Despacho</html>")
+        assert await collect(client, response, expected_content_type="text/html") == b"<html>Despacho</html>"
+    
+    @pytest.mark.asyncio
+    async def test_rejects_empty_body(self, client):
+        """Corpo vazio com status 200 não é aceito como documento."""
+        response = httpx.Response(200, headers={"content-type": "application/pdf"}, content=b"")
+        with pytest.raises(PermanentPDPJError):
+            await collect(client, response)
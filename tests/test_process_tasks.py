@@ -0,0 +1,26 @@
+"""Testes para as tasks de processamento de processos."""
+
+from unittest.mock import MagicMock, patch
+
+from app.tasks import process_tasks
+from app.tasks.process_tasks import process_batch_search
+
+
+class TestProcessBatchSearch:
+    """Testes para process_batch_search."""
+    
+    def test_normalizes_before_dedup(self):
+        """Números formatados e não formatados do mesmo processo são buscados uma vez."""
+        run_batch = MagicMock()
+        
+        with patch.object(process_tasks, "_run_batch", run_batch), \
+             patch.object(process_tasks, "run_async", return_value=[]):
+            result = process_batch_search.apply(args=([
+                "1000145-91.2023.8.26.0597",
+                "10001459120238260597",
+                "1000146-91.2023.8.26.0597"
+            ],)).get()
+        
+        assert result["total_requested"] == 3
+        assert result["duplicates_removed"] == 1
+        assert run_batch.call_args.args[0] == ["10001459120238260597", "10001469120238260597"]
@@ -0,0 +1,71 @@
+"""Testes para os utilitários de número de processo."""
+
+import pytest
+
+from app.utils.process_utils import (
+    format_process_number,
+    normalize_process_numbers,
+    validate_process_number
+)
+
+
+class TestValidateProcessNumber:
+    """Testes para validate_process_number (20 dígitos, quaisquer separadores)."""
+    
+    @pytest.mark.parametrize("process_number", [
+        "1000145-91.2023.8.26.0597",
+        "10001459120238260597",
+        "1000145/91.2023.8.26.0597",
+        "1000145 - 91.2023.8.26.0597",
+        " 1000145-91.2023.8.26.0597\n",
+    ])
+    def test_valid(self, process_number):
+        """Números formatados, não formatados e com outros separadores são aceitos."""
+        assert validate_process_number(process_number) is True
+    
+    @pytest.mark.parametrize("process_number", [
+        "",
+        None,
+        "1000145-91.2023.8.26.059",
+        "1000145-91.2023.8.26.05970",
+        "abc",
+        "1000145-91.2023.8.26.059X",
+    ])
+    def test_invalid(self, process_number):
+        """Números com mais ou menos de 20 dígitos são rejeitados."""
+        assert validate_process_number(process_number) is False
+
+
+class TestNormalizeProcessNumbers:
+    """Testes para normalize_process_numbers."""
+    
+    def test_normalizes_in_order(self):
+        """Formatados e não formatados viram só dígitos, na mesma ordem."""
+        assert normalize_process_numbers([
+            "1000145-91.2023.8.26.0597",
+            "10001459120238260597",
+            " 0000001-02.2024.5.01.0001 ",
+            "",
+        ]) == [
+            "10001459120238260597",
+            "10001459120238260597",
+            "00000010220245010001",
+            "",
+        ]
+
+
+class TestFormatProcessNumber:
+    """Testes para format_process_number (NNNNNNN-DD.AAAA.J.TR.OOOO)."""
+    
+    @pytest.mark.parametrize("process_number, expected", [
+        ("10001459120238260597", "1000145-91.2023.8.26.0597"),
+        ("00000010220245010001", "0000001-02.2024.5.01.0001"),
+    ])
+    def test_cnj_format(self, process_number, expected):
+        """Número normalizado é formatado no padrão CNJ."""
+        assert format_process_number(process_number) == expected
+    
+    @pytest.mark.parametrize("process_number", ["", "1000145", "100014591202382605970"])
+    def test_unchanged_when_not_20_digits(self, process_number):
+        """Números sem 20 dígitos são devolvidos sem alteração."""
+        assert format_process_number(process_number) == process_number
@@ -0,0 +1,43 @@
+"""Testes para o upload em streaming do S3."""
+
+import asyncio
+import pytest
+from unittest.mock import MagicMock
+
+from app.services.s3_service import S3Service, S3ServiceError
+
+
+class FailingClient:
+    """Cliente S3 cujo multipart upload falha (ex.: credenciais ou rede)."""
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        return False
+    
+    async def create_multipart_upload(self, **kwargs):
+        raise RuntimeError("S3 indisponível")
+
+
+class TestUploadStream:
+    """Testes para S3Service.upload_stream."""
+    
+    @pytest.mark.asyncio
+    async def test_closes_body_when_s3_fails(self):
+        """Falha no S3 com a origem pausada no meio do arquivo fecha a origem (libera o semáforo)."""
+        semaphore = asyncio.Semaphore(1)
+        
+        async def body():
+            async with semaphore:
+                yield b"%PDF-1.4"
+                yield b"resto"
+        
+        service = S3Service()
+        service.session = MagicMock()
+        service.session.client.return_value = FailingClient()
+        
+        with pytest.raises(S3ServiceError):
+            await service.upload_stream(body(), "10001459120238260597", document_id="doc-1", filename="doc.pdf", part_size=4)
+        
+        assert not semaphore.locked()
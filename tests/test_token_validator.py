@@ -0,0 +1,87 @@
+"""Testes para a validação de tokens JWT da API PDPJ."""
+
+import base64
+import json
+import time
+import pytest
+
+from app.utils.token_validator import _MAX_TOKEN_LENGTH, _decode_payload, PDPJTokenValidator
+
+
+def make_token(payload: dict) -> str:
+    """Montar um JWT (assinatura não é verificada pelo validador)."""
+    def encode(data: dict) -> str:
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b"=").decode()
+    return f"{encode({'alg': 'RS256'})}.{encode(payload)}.assinatura"
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    _decode_payload.cache_clear()
+    yield
+    _decode_payload.cache_clear()
+
+
+class TestDecodePayload:
+    """Testes para o cache de payloads decodificados."""
+    
+    def test_cache_hit_returns_read_only_payload(self):
+        """O mesmo token é decodificado uma vez e o payload compartilhado não pode ser alterado."""
+        token = make_token({"iss": "https://sso.cloud.pje.jus.br", "exp": time.time() + 3600})
+        
+        first = _decode_payload(token)
+        second = _decode_payload(token)
+        
+        assert first is second
+        assert _decode_payload.cache_info().hits == 1
+        with pytest.raises(TypeError):
+            first["exp"] = 0
+    
+    def test_not_a_jwt(self):
+        """Token sem três partes não é decodificado."""
+        assert _decode_payload("abc.def") is None
+
+
+class TestValidateToken:
+    """Testes para PDPJTokenValidator.validate_token."""
+    
+    def test_valid_token(self):
+        """Token PJE dentro da validade."""
+        token = make_token({
+            "iss": "https://sso.cloud.pje.jus.br/auth/realms/pje",
+            "exp": time.time() + 7200,
+            "allowed-origins": ["https://portaldeservicos.pdpj.jus.br"],
+            "name": "Fulano"
+        })
+        
+        result = PDPJTokenValidator.validate_token(token, "https://portaldeservicos.pdpj.jus.br")
+        
+        assert result.is_valid
+        assert result.is_pje_token
+        assert 1.9 < result.hours_remaining <= 2
+        assert result.allowed_origins == ["https://portaldeservicos.pdpj.jus.br"]
+        
+        # Alterar o resultado não afeta o payload em cache
+        result.allowed_origins.append("https://outro.jus.br")
+        assert PDPJTokenValidator.validate_token(token).allowed_origins == ["https://portaldeservicos.pdpj.jus.br"]
+    
+    def test_expired_token(self):
+        """Token expirado é rejeitado."""
+        result = PDPJTokenValidator.validate_token(make_token({"exp": time.time() - 60}))
+        
+        assert not result.is_valid
+        assert result.is_expired
+    
+    @pytest.mark.parametrize("token", ["abc.@@@.def", "abc.e30.def.ghi", "sem-pontos"])
+    def test_malformed_token(self, token):
+        """Token malformado é inválido, sem levantar exceção."""
+        assert not PDPJTokenValidator.validate_token(token).is_valid
+    
+    def test_oversize_token(self):
+        """Token acima do limite não é decodificado nem entra no cache."""
+        token = make_token({"pad": "x" * _MAX_TOKEN_LENGTH})
+        
+        result = PDPJTokenValidator.validate_token(token)
+        
+        assert not result.is_valid
+        assert _decode_payload.cache_info().currsize == 0